@@ -1,37 +1,38 @@
 import logging
-from fastapi import APIRouter, HTTPException, Query, Body
-from fastapi.responses import JSONResponse
-from starlette.concurrency import run_in_threadpool
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 
 # Importamos los modelos y servicios
-from app.models.flashcard import UpdateStatusRequest, ResetRequest
+from app.api.responses import ORJSONResponse, etag_response, json_etag_response
+from app.api.routing import json_body, json_body_openapi
+from app.models.flashcard import CATEGORY_PATTERN, DECK_PATTERN, UpdateStatusRequest, ResetRequest
 from app.services import deck_service
 
 router = APIRouter()
 
 # --- ¡NUEVO ENDPOINT! ---
 @router.get("/categories")
-async def get_categories():
+async def get_categories(request: Request):
     """Retorna la lista de todas las categorías (carpetas) disponibles."""
     try:
-        categories = await run_in_threadpool(deck_service.list_categories)
-        return JSONResponse({"success": True, "categories": categories})
+        categories = await deck_service.list_categories()
+        return json_etag_response(request, {"success": True, "categories": categories})
     except Exception as e:
         logging.error(f"No se pudieron listar las categorías: {e}")
         raise HTTPException(status_code=500, detail=f"No se pudieron listar las categorías: {e}")
 
 # --- ¡MODIFICADO! ---
 @router.get("/available-flashcards-files")
-async def get_available_flashcards_files(category: str = Query(...)):
+async def get_available_flashcards_files(request: Request, category: str = Query(..., pattern=CATEGORY_PATTERN)):
     """Retorna la lista de todos los archivos JSON de decks disponibles PARA UNA CATEGORÍA."""
     try:
         # Llama al servicio modificado con la categoría
-        file_list = await run_in_threadpool(deck_service.list_decks, category)
+        file_list = await deck_service.list_decks(category)
         
         default_deck = file_list[0] if file_list else ""
         
-        return JSONResponse({"success": True, "files": file_list, "active_file": default_deck})
+        return json_etag_response(request, {"success": True, "files": file_list, "active_file": default_deck})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"Categoría no encontrada: {category}")
     except Exception as e:
@@ -40,12 +41,20 @@ async def get_available_flashcards_files(category: str = Query(...)):
 
 # --- ¡MODIFICADO! ---
 @router.get("/flashcards-data")
-async def get_flashcards_data(category: str = Query(...), deck: str = Query(...)):
-    """Retorna los datos del deck especificado DENTRO de una categoría."""
+async def get_flashcards_data(request: Request, category: str = Query(..., pattern=CATEGORY_PATTERN), deck: str = Query(..., pattern=DECK_PATTERN), raw: bool = Query(False)):
+    """
+    Retorna los datos del deck especificado DENTRO de una categoría.
+    Con ?raw=1 se transmite el JSON guardado en GCS por trozos, sin parsearlo
+    (no incluye cambios de estado que aún estén en cola).
+    """
     try:
-        # Llama al servicio modificado con ambos parámetros
-        data = await run_in_threadpool(deck_service.get_deck_data, category, deck)
-        return JSONResponse(data)
+        if raw:
+            chunks = await deck_service.open_deck_stream(category, deck)
+            return StreamingResponse(chunks, media_type="application/json")
+        # Llama al servicio modificado con ambos parámetros; el deck llega
+        # ya serializado, así que se envía sin volver a pasar por JSON
+        payload, digest = await deck_service.get_deck_payload(category, deck)
+        return etag_response(request, payload, digest)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"Archivo de deck no encontrado: {category}/{deck}")
     except Exception as e:
@@ -53,19 +62,19 @@ async def get_flashcards_data(category: str = Query(...), deck: str = Query(...)
         raise HTTPException(status_code=500, detail=f"No se pudieron cargar los datos: {e}")
 
 # --- ¡MODIFICADO! ---
-@router.post('/update-status')
-async def update_card_status(request_data: UpdateStatusRequest):
+@router.post('/update-status', openapi_extra=json_body_openapi(UpdateStatusRequest))
+async def update_card_status(request_data: UpdateStatusRequest = Depends(json_body(UpdateStatusRequest))):
     """Actualiza el estado de la tarjeta para el deck especificado."""
     # (El modelo 'UpdateStatusRequest' AHORA ESTÁ INCORRECTO, lo arreglamos en el sig. paso)
+    # El cambio se valida y encola; la subida a GCS se agrupa con los siguientes clics
     try:
-        await run_in_threadpool(
-            deck_service.update_card_status,
+        await deck_service.update_card_status(
             request_data.category, # <-- ¡NUEVO!
             request_data.deck, 
             request_data.index, 
             request_data.learned
         )
-        return JSONResponse({"success": True, "message": f"Tarjeta {request_data.index} actualizada."})
+        return ORJSONResponse({"success": True, "message": f"Tarjeta {request_data.index} actualizada."})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"Deck no encontrado: {request_data.category}/{request_data.deck}")
     except IndexError:
@@ -75,32 +84,31 @@ async def update_card_status(request_data: UpdateStatusRequest):
         raise HTTPException(status_code=500, detail=f"Error al actualizar el estado: {e}")
 
 # --- ¡MODIFICADO! ---
-@router.post("/reset-all")
-async def reset_all_statuses(request_data: ResetRequest):
+@router.post("/reset-all", openapi_extra=json_body_openapi(ResetRequest))
+async def reset_all_statuses(request_data: ResetRequest = Depends(json_body(ResetRequest))):
     """Resetea el estado de todas las tarjetas para el deck especificado."""
     # (El modelo 'ResetRequest' AHORA ESTÁ INCORRECTO, lo arreglamos en el sig. paso)
     try:
-        await run_in_threadpool(
-            deck_service.reset_deck_status, 
+        # El servicio guarda antes los cambios encolados y resetea fuera del event loop
+        await deck_service.reset_deck_status(
             request_data.category, # <-- ¡NUEVO!
             request_data.deck
         )
-        return JSONResponse({"success": True, "message": f"Todas las tarjetas en '{request_data.deck}' reseteadas."})
+        return ORJSONResponse({"success": True, "message": f"Todas las tarjetas en '{request_data.deck}' reseteadas."})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"Deck no encontrado para reset: {request_data.category}/{request_data.deck}")
     except Exception as e:
         logging.error(f"Error al resetear deck {request_data.deck}: {e}")
         raise HTTPException(status_code=500, detail=f"Error al resetear: {e}")
 
-# --- (SIN CAMBIOS) ---
 @router.get("/phonics-data")
-async def get_phonics_data():
+async def get_phonics_data(request: Request):
     """
     Retorna los datos de fonética desde static/json/phonics.json.
     """
     try:
-        data = await run_in_threadpool(deck_service.get_phonics_data)
-        return JSONResponse(content=data)
+        data = await deck_service.get_phonics_data()
+        return json_etag_response(request, data)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
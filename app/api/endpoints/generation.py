@@ -1,25 +1,58 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+import asyncio
 import logging
-from fastapi.responses import JSONResponse, FileResponse
+import re
+from functools import lru_cache
+from fastapi.responses import FileResponse
 from starlette.concurrency import run_in_threadpool
-from pathlib import Path
 
 # Importamos modelos y servicios
-from app.models.flashcard import ImageGenerateRequest, ImageDeleteRequest, SynthesizeRequest
+from app.api.responses import ORJSONResponse
+from app.api.routing import json_body, json_body_openapi
+from app.models.flashcard import CATEGORY_PATTERN, DECK_PATTERN, ImageGenerateRequest, ImageBulkGenerateRequest, ImageDeleteRequest, ImageBulkDeleteRequest, SynthesizeRequest
 from app.services import image_service, audio_service
 from app.core.config import settings
 
 router = APIRouter()
 
+# Limita las subidas simultáneas para acotar memoria y conexiones a GCS
+_upload_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_UPLOADS)
+
+# Patrones precompilados de las URLs públicas de GCS (https://host/bucket/<prefijo>/...):
+# un solo match anclado en C en lugar de split + f-strings por petición
+_IMG_RE = re.compile(rf"^https?://[^/]+/[^/]+/(?P<p>{re.escape(settings.GCS_IMAGES_PREFIX)}/.*)$")
+_AUDIO_RE = re.compile(rf"^https?://[^/]+/[^/]+/{re.escape(settings.GCS_AUDIO_PREFIX)}/(?P<p>.*)$")
+
+# Extensiones de imagen aceptadas en /upload-image (sin punto, en minúsculas)
+_ALLOWED_IMAGE_EXTENSIONS = frozenset({"jpg", "jpeg", "png", "webp"})
+
+@lru_cache(maxsize=4096)
+def _image_web_path(url_or_path: str) -> tuple[str, str]:
+    """
+    Convierte la URL de GCS de una imagen en (filename, ruta relativa).
+    URL GCS: https://storage.googleapis.com/bucket/card_images/category/deck/file.jpg
+    Ruta relativa esperada: /card_images/category/deck/file.jpg
+    """
+    filename = url_or_path.rpartition("/")[2]
+    m = _IMG_RE.match(url_or_path)
+    # Fallback si la estructura de URL no es la esperada
+    web_path = "/" + m.group("p") if m else url_or_path
+    return filename, web_path
+
+@lru_cache(maxsize=4096)
+def _audio_relative_path(url_or_path: str) -> str | None:
+    """Devuelve la parte de la URL de GCS posterior a 'card_audio/' (o None si no coincide)."""
+    m = _AUDIO_RE.match(url_or_path)
+    return m.group("p") if m else None
+
 # --------------------------------------------------------------------
 # 📸 GENERACIÓN DE IMÁGENES
 # --------------------------------------------------------------------
-@router.post('/generate-image')
-async def generate_image_api(request_data: ImageGenerateRequest):
+@router.post('/generate-image', openapi_extra=json_body_openapi(ImageGenerateRequest))
+def generate_image_api(request_data: ImageGenerateRequest = Depends(json_body(ImageGenerateRequest))):
     """Genera una imagen (o recupera una existente) para una tarjeta."""
-    
-    success, error_message, url_or_path = await run_in_threadpool(
-        image_service.generate_image,
+    # Handler síncrono: todo el cuerpo es bloqueante, FastAPI lo despacha al threadpool
+    success, error_message, url_or_path = image_service.generate_image(
         request_data.prompt,
         request_data.category,  # <-- ¡AÑADIDO!
         request_data.deck,
@@ -30,21 +63,9 @@ async def generate_image_api(request_data: ImageGenerateRequest):
     
     if success:
         # Extraer el nombre del archivo y construir la ruta relativa
-        # URL GCS: https://storage.googleapis.com/bucket/card_images/category/deck/file.jpg
-        # Ruta relativa esperada: /card_images/category/deck/file.jpg
-        
-        filename = url_or_path.split("/")[-1]
-        
-        # Encontrar la parte de la ruta que empieza con card_images
-        # Esto asume que la URL de GCS contiene el prefijo configurado
-        try:
-            relative_path = url_or_path.split(f"/{settings.GCS_IMAGES_PREFIX}/")[1]
-            web_path = f"/{settings.GCS_IMAGES_PREFIX}/{relative_path}"
-        except IndexError:
-            # Fallback si la estructura de URL no es la esperada
-            web_path = url_or_path
-
-        return JSONResponse({
+        filename, web_path = _image_web_path(url_or_path)
+
+        return ORJSONResponse({
             "success": True, 
             "filename": filename,
             "path": web_path # Retornamos ruta relativa para que el frontend use el redirect
@@ -54,7 +75,7 @@ async def generate_image_api(request_data: ImageGenerateRequest):
             # Intentamos reconstruir el nombre esperado para el error 404
             expected_filename = f"{request_data.deck.replace('.json', '')}_card_{request_data.index}_def{request_data.def_index}.jpg"
             
-            return JSONResponse(
+            return ORJSONResponse(
                 content={
                     "success": False,
                     "message": error_message,
@@ -64,29 +85,74 @@ async def generate_image_api(request_data: ImageGenerateRequest):
             )
         raise HTTPException(status_code=500, detail=error_message)
 
+@router.post('/generate-images-bulk', openapi_extra=json_body_openapi(ImageBulkGenerateRequest))
+def generate_images_bulk_api(request_data: ImageBulkGenerateRequest = Depends(json_body(ImageBulkGenerateRequest))):
+    """
+    Genera (o recupera) las imágenes de varias tarjetas de un deck en una sola
+    petición. Responde un resultado por item, en el mismo orden.
+    """
+    results = image_service.generate_images_bulk(
+        request_data.category,
+        request_data.deck,
+        [(item.prompt, item.index, item.def_index) for item in request_data.items],
+        request_data.force_generation
+    )
+
+    deck_prefix = request_data.deck.replace('.json', '')
+    items = []
+    for item, (success, error_message, url_or_path) in zip(request_data.items, results):
+        if success:
+            filename, web_path = _image_web_path(url_or_path)
+            items.append({"index": item.index, "def_index": item.def_index, "success": True, "filename": filename, "path": web_path})
+        else:
+            items.append({
+                "index": item.index,
+                "def_index": item.def_index,
+                "success": False,
+                "message": error_message,
+                "filename_expected": f"{deck_prefix}_card_{item.index}_def{item.def_index}.jpg"
+            })
+    return ORJSONResponse({"success": all(entry["success"] for entry in items), "items": items})
+
 # --------------------------------------------------------------------
 # 🗑️ ELIMINACIÓN DE IMÁGENES
 # --------------------------------------------------------------------
-@router.delete('/delete-image')
-async def delete_image_api(request_data: ImageDeleteRequest):
+@router.delete('/delete-image', openapi_extra=json_body_openapi(ImageDeleteRequest))
+def delete_image_api(request_data: ImageDeleteRequest = Depends(json_body(ImageDeleteRequest))):
     """Elimina la imagen asociada a una tarjeta."""
-    success, message = await run_in_threadpool(
-        image_service.delete_image,
+    success, message = image_service.delete_image(
         request_data.category,  # <-- ¡AÑADIDO!
         request_data.deck,
         request_data.index,
         request_data.def_index
     )
     if success:
-        return JSONResponse({"success": True, "message": message})
+        return ORJSONResponse({"success": True, "message": message})
     else:
         raise HTTPException(status_code=500, detail=message)
 
+@router.delete('/delete-images-bulk', openapi_extra=json_body_openapi(ImageBulkDeleteRequest))
+def delete_images_bulk_api(request_data: ImageBulkDeleteRequest = Depends(json_body(ImageBulkDeleteRequest))):
+    """
+    Elimina las imágenes de varias tarjetas de un deck en una sola petición.
+    Responde un resultado por item, en el mismo orden.
+    """
+    results = image_service.delete_images_bulk(
+        request_data.category,
+        request_data.deck,
+        [(item.index, item.def_index) for item in request_data.items]
+    )
+    items = [
+        {"index": item.index, "def_index": item.def_index, "success": success, "message": message}
+        for item, (success, message) in zip(request_data.items, results)
+    ]
+    return ORJSONResponse({"success": all(entry["success"] for entry in items), "items": items})
+
 # --------------------------------------------------------------------
 # 🔊 SÍNTESIS DE VOZ (TTS)
 # --------------------------------------------------------------------
-@router.post("/synthesize-speech")
-async def synthesize_speech_api(request: Request, request_data: SynthesizeRequest):
+@router.post("/synthesize-speech", openapi_extra=json_body_openapi(SynthesizeRequest))
+async def synthesize_speech_api(request: Request, request_data: SynthesizeRequest = Depends(json_body(SynthesizeRequest))):
     """
     Genera (o reutiliza) un archivo de voz TTS desde el texto enviado.
     Ahora retorna la URL pública de GCS en lugar de servir el archivo directamente.
@@ -106,66 +172,77 @@ async def synthesize_speech_api(request: Request, request_data: SynthesizeReques
         # URL GCS: https://storage.googleapis.com/bucket/card_audio/category/deck/file.mp3
         # Proxy URL: http://localhost:8000/card_audio/category/deck/file.mp3
         
-        try:
-            # Intentar extraer la parte relativa después de 'card_audio'
-            if f"/{settings.GCS_AUDIO_PREFIX}/" in url_or_path:
-                relative_path = url_or_path.split(f"/{settings.GCS_AUDIO_PREFIX}/")[1]
-                # Construir URL absoluta usando la request actual
-                # request.base_url devuelve ej: http://localhost:8000/
-                proxy_url = f"{request.base_url}{settings.GCS_AUDIO_PREFIX}/{relative_path}"
-            else:
-                # Si no coincide el formato esperado, devolver tal cual (fallback)
-                proxy_url = url_or_path
-        except Exception:
+        # Intentar extraer la parte relativa después de 'card_audio'
+        relative_path = _audio_relative_path(url_or_path)
+        if relative_path is not None:
+            # Construir URL absoluta usando la request actual
+            # request.base_url devuelve ej: http://localhost:8000/
+            proxy_url = f"{request.base_url}{settings.GCS_AUDIO_PREFIX}/{relative_path}"
+        else:
+            # Si no coincide el formato esperado, devolver tal cual (fallback)
             proxy_url = url_or_path
 
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True,
             "audio_url": proxy_url
         })
     
     print(f"❌ Synthesize Speech Error: {error_message}")
-    status_code = 400 if "400" in error_message else 500
+    status_code = 400 if "400" in error_message else 503 if "503" in error_message else 500
     raise HTTPException(status_code=status_code, detail=error_message)
 
+@router.get("/audio-bulk")
+async def download_deck_audio_api(category: str = Query(..., pattern=CATEGORY_PATTERN), deck: str = Query(..., pattern=DECK_PATTERN)):
+    """
+    Retorna un ZIP con todos los audios ya generados del deck, para precargarlos
+    de una vez en lugar de pedir cada mp3 por separado.
+    """
+    count, archive = await run_in_threadpool(audio_service.build_deck_audio_zip, category, deck)
+    if not count:
+        raise HTTPException(status_code=404, detail=f"No hay audios generados para {category}/{deck}")
+    filename = f"{deck.replace('.json', '')}_audio.zip"
+    return Response(
+        content=archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @router.post('/upload-image')
 async def upload_image_api(
-    category: str = Form(...), 
-    deck: str = Form(...), 
+    category: str = Form(..., pattern=CATEGORY_PATTERN), 
+    deck: str = Form(..., pattern=DECK_PATTERN), 
     card_index: int = Form(...),
     def_index: int = Form(...),
     file: UploadFile = File(...) # Archivo subido
 ):
     """Sube y guarda una imagen en GCS para una tarjeta específica."""
     
-    # 1. Leer el contenido del archivo subido
-    try:
-        file_content = await file.read()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"No se pudo leer el archivo: {e}")
-
+    # 0. Validar la extensión con operaciones de str (sin construir un Path)
+    _, dot, ext = (file.filename or "").rpartition(".")
+    ext = ext.lower() if dot else ""
+    if ext not in _ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Extensión de imagen no permitida: '{ext}'")
+    
+    # 1. Starlette ya guarda el archivo subido en un SpooledTemporaryFile
+    #    (memoria hasta 1 MB, disco a partir de ahí): lo transmitimos tal cual
+    #    a GCS en lugar de leerlo entero con `await file.read()`.
     # 2. Llamar al servicio de subida (que también actualiza el JSON)
-    success, error_message, url_or_path = await run_in_threadpool(
-        image_service.upload_image,
-        category,
-        deck,
-        card_index,
-        def_index,
-        file_content,
-        Path(file.filename).suffix.lower()
-    )
+    async with _upload_semaphore:
+        success, error_message, url_or_path = await run_in_threadpool(
+            image_service.upload_image,
+            category,
+            deck,
+            card_index,
+            def_index,
+            file.file,
+            f".{ext}"
+        )
     
     if success:
         # Construir ruta relativa
-        filename = url_or_path.split("/")[-1]
-        
-        try:
-            relative_path = url_or_path.split(f"/{settings.GCS_IMAGES_PREFIX}/")[1]
-            web_path = f"/{settings.GCS_IMAGES_PREFIX}/{relative_path}"
-        except IndexError:
-            web_path = url_or_path
+        filename, web_path = _image_web_path(url_or_path)
         
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True, 
             "filename": filename,
             "path": web_path
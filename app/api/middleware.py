@@ -0,0 +1,23 @@
+# Archivo: app/api/middleware.py
+from typing import Any, Iterable
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class PathGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware limitado a un conjunto de rutas (los JSON voluminosos de
+    decks y fonética). El resto (audio MP3, redirecciones, respuestas
+    pequeñas) pasa sin tocar para no gastar CPU comprimiendo en vano.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], **kwargs: Any) -> None:
+        super().__init__(app, **kwargs)
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
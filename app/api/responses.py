@@ -0,0 +1,65 @@
+# Archivo: app/api/responses.py
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, JSONResponse
+
+# Opciones comunes de serialización para todas las respuestas JSON
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse serializada con orjson (bytes directos, sin pasar por json.dumps).
+    Se define aquí porque la versión incluida en FastAPI está deprecada.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+def body_digest(body: bytes) -> str:
+    """Huella corta (blake2b, 8 bytes) de un cuerpo de respuesta, usada como ETag."""
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (admite listas y '*')."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+def etag_response(request: Request, body: bytes, digest: Optional[str] = None, media_type: str = "application/json") -> Response:
+    """
+    Responde `body` con un ETag débil. Si el cliente ya tiene esa versión
+    (If-None-Match coincide) devuelve 304 sin cuerpo.
+    """
+    etag = f'W/"{digest or body_digest(body)}"'
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type=media_type, headers={"ETag": etag})
+
+
+def json_etag_response(request: Request, content: Any) -> Response:
+    """Serializa `content` con orjson y lo responde con ETag (ver `etag_response`)."""
+    return etag_response(request, orjson.dumps(content, option=_ORJSON_OPTIONS))
+
+
+def file_etag_response(request: Request, path: Path, stat_result: os.stat_result, media_type: str) -> Response:
+    """
+    FileResponse con el stat ya hecho (no lo repite al enviar). Si el cliente ya
+    tiene esa versión (If-None-Match contra el ETag de tamaño + mtime) devuelve 304.
+    """
+    response = FileResponse(path, media_type=media_type, stat_result=stat_result)
+    etag = response.headers["etag"]
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Last-Modified": response.headers["last-modified"]})
+    return response
@@ -0,0 +1,40 @@
+# Archivo: app/api/routing.py
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def json_body(model: type[ModelT]) -> Callable[[Request], Awaitable[ModelT]]:
+    """
+    Dependencia que valida el cuerpo crudo con `model.model_validate_json`:
+    pydantic-core parsea y valida en una sola pasada, sin el dict intermedio
+    que FastAPI construye para un parámetro de cuerpo normal. Los errores se
+    devuelven como el mismo 422 (con 'body' al inicio de cada `loc`).
+    Usar junto a `openapi_extra=json_body_openapi(model)` para documentar el cuerpo.
+    """
+
+    async def dependency(request: Request) -> ModelT:
+        body = await request.body()
+        try:
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            errors = e.errors(include_url=False)
+            for error in errors:
+                error["loc"] = ("body", *error["loc"])
+            raise RequestValidationError(errors, body=body)
+
+    return dependency
+
+
+def json_body_openapi(model: type[BaseModel]) -> Dict[str, Any]:
+    """`openapi_extra` que documenta `model` como cuerpo JSON de una ruta que usa `json_body`."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}},
+        }
+    }
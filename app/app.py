@@ -1,11 +1,19 @@
 import os
+import re
+import asyncio
 import uvicorn
 import logging
-import json
 import hashlib
+import mmap
 import sys
+import tempfile
+import threading
+import orjson
+from collections import defaultdict
+from functools import lru_cache
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 # Importaciones de Google Cloud
 try:
@@ -16,21 +24,42 @@ except ImportError as e:
     print(f"FATAL: Falta una o más librerías. {e}. Instala: pip install google-cloud-aiplatform google-cloud-texttospeech pydantic")
     sys.exit(1)
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from requests.exceptions import Timeout, ConnectionError
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from starlette.concurrency import run_in_threadpool
 
 # Configuración de Logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
+class ORJSONResponse(JSONResponse):
+    """JSONResponse serializada con orjson (la versión de FastAPI está deprecada)."""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
 # ----------------------------------------------------------------------
 # --- CONFIGURACIÓN DE FASTAPI ---
 # ----------------------------------------------------------------------
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Carpeta de imágenes de cada deck creada (y normalizada a .jpg) una sola vez
+    await run_in_threadpool(_prepare_image_dirs_sync)
+    # Volcado periódico de los cambios de estado (ver _update_card_status_sync)
+    flusher = asyncio.create_task(_dirty_decks_flusher())
+    yield
+    flusher.cancel()
+    try:
+        await flusher
+    except asyncio.CancelledError:
+        pass
+    # Nada pendiente se pierde al apagar
+    _flush_dirty_decks_sync()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # SOLUCIÓN CORS
 app.add_middleware(
@@ -47,48 +76,43 @@ app.add_middleware(
 PROJECT_ID = "xrubi-fd22e" # DEBE SER TU PROJECT ID REAL
 REGION = "us-central1"
 CARD_IMAGES_BASE_DIR = "card_images" # Directorio base fijo
-IMAGE_DIR = "" # Directorio de imágenes dinámico (e.g., 'card_images/get')
 AUDIO_DIR = "card_audio"
 STATIC_DIR = "static"
 JSON_SUB_DIR = "json"
 SERVER_TIMEOUT = 300
 
-# --- VARIABLES GLOBALES PARA GESTIÓN DE ARCHIVOS ---
-FLASHCARDS_FILE_NAME = "get.json" 
+# --- DECK POR DEFECTO (si la petición no indica ninguno) ---
+DEFAULT_FLASHCARDS_FILE_NAME = "get.json" 
 
 BASE_DIR = Path(__file__).resolve().parent
 JSON_DIR_PATH = BASE_DIR / STATIC_DIR / JSON_SUB_DIR
 
-def get_current_flashcards_path() -> Path:
-    """Retorna la ruta completa al archivo JSON de flashcards actualmente activo."""
-    return JSON_DIR_PATH / FLASHCARDS_FILE_NAME
-
-def _set_dynamic_image_dir(deck_name_base: str):
-    """Establece IMAGE_DIR y asegura que el subdirectorio exista, basado en el nombre del deck."""
-    global IMAGE_DIR
-    global CARD_IMAGES_BASE_DIR
-    
-    # 1. Obtener el nombre de la carpeta (ej. 'get' de 'get.json')
-    folder_name = deck_name_base.replace(".json", "")
-    
-    # 2. Construir la ruta completa del directorio de imágenes (e.g., 'card_images/get')
-    new_image_dir = os.path.join(CARD_IMAGES_BASE_DIR, folder_name)
-    
-    # 3. Crear el directorio si no existe
-    os.makedirs(new_image_dir, exist_ok=True)
-    
-    # 4. Actualizar la variable global
-    IMAGE_DIR = new_image_dir
-    logging.info(f"📁 Directorio de imágenes activo: {IMAGE_DIR}")
+# Caché de decks ya parseados: nombre de archivo -> (st_mtime_ns, datos).
+# Las lecturas solo re-parsean si el archivo cambió en disco; las escrituras la actualizan.
+_FLASHCARDS_CACHE: dict[str, tuple[int, list]] = {}
+_FLASHCARDS_CACHE_LOCK = threading.Lock()
+# Decks con cambios de estado aún no escritos a disco: nombre de archivo -> datos
+_DIRTY_DECKS: dict[str, list] = {}
+FLUSH_INTERVAL = 0.5 # Segundos entre volcados de cambios pendientes
+MMAP_MIN_DECK_SIZE = 64 * 1024 # A partir de este tamaño el deck se parsea desde un mmap
+
+def _deck_file_name(deck: Optional[str]) -> str:
+    """Normaliza el deck de la petición a un nombre de archivo ('go' -> 'go.json')."""
+    if not deck:
+        return DEFAULT_FLASHCARDS_FILE_NAME
+    # basename: el deck viene del cliente y no debe salir de JSON_DIR_PATH
+    name = os.path.basename(deck)
+    return name if name.endswith(".json") else f"{name}.json"
+
+def _get_image_dir(deck_file: str) -> str:
+    """Directorio de imágenes del deck (e.g., 'card_images/get' para 'get.json')."""
+    return os.path.join(CARD_IMAGES_BASE_DIR, deck_file.replace(".json", ""))
 
 # Crear directorios fijos si no existen
 os.makedirs(AUDIO_DIR, exist_ok=True)
 os.makedirs(JSON_DIR_PATH, exist_ok=True)
 os.makedirs(CARD_IMAGES_BASE_DIR, exist_ok=True) # Asegura que el directorio padre exista
 
-# Inicializar el directorio de imágenes dinámico para el archivo por defecto
-_set_dynamic_image_dir(FLASHCARDS_FILE_NAME) # Inicializa IMAGE_DIR y crea la carpeta (e.g., card_images/get)
-
 # Inicialización de clientes
 ia_model = None
 tts_client = None
@@ -107,60 +131,121 @@ except Exception as e:
 # ----------------------------------------------------------------------
 # --- MODELOS DE DATOS (PYDANTIC) ---
 # ----------------------------------------------------------------------
-class GenerateRequest(BaseModel):
+class _RequestModel(BaseModel):
+    """Base de los cuerpos de petición: inmutables y sin campos extra (se ignoran)."""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+class GenerateRequest(_RequestModel):
+    deck: Optional[str] = Field(None, description="Nombre del deck de la tarjeta (e.g., 'get'); sin él se usa el deck por defecto.")
     index: int = Field(..., description="Índice de la flashcard.")
     def_index: int = Field(0, description="Índice de la definición (0 por defecto).")
     prompt: str = Field(..., description="Prompt de texto para la generación de imagen.")
     force_generation: bool = Field(False, description="Si es 'False', solo se busca la imagen existente, no se genera.") # 👈 CAMBIO A FALSE
 
-class DeleteRequest(BaseModel):
+class DeleteRequest(_RequestModel):
+    deck: Optional[str] = Field(None, description="Nombre del deck de la tarjeta (e.g., 'get'); sin él se usa el deck por defecto.")
     index: int
     def_index: int = 0
 
-class SynthesizeRequest(BaseModel):
+class SynthesizeRequest(_RequestModel):
     text: str = Field(..., description="Texto a sintetizar.")
     voice_name: str = Field("Aoede", description="Nombre de la voz TTS.")
     model_name: Optional[str] = Field("gemini-2.5-pro-tts", description="Nombre del modelo TTS.")
     deck: Optional[str] = Field(None, description="Nombre del deck actual, enviado por el frontend.")
 
-class UpdateStatusRequest(BaseModel):
+class UpdateStatusRequest(_RequestModel):
     index: int = Field(..., description="Índice de la tarjeta a actualizar.")
     learned: bool = Field(..., description="Nuevo estado de aprendizaje.")
-    deck: Optional[str] = None # No se usa pero se mantiene por consistencia con el frontend
+    deck: Optional[str] = None # Deck de la tarjeta; sin él se usa el deck por defecto
 
-class ResetRequest(BaseModel):
+class ResetRequest(_RequestModel):
     deck: str = Field(..., description="Nombre del deck a resetear.") # Modelo añadido para reset
 
 # ----------------------------------------------------------------------
 # --- LÓGICA DE GENERACIÓN DE IMAGENES Y SÍNTESIS DE VOZ ---
 # ----------------------------------------------------------------------
 
-def _get_deck_prefix() -> str:
-    """Extrae el nombre base del deck/verbo del IMAGE_DIR actual."""
-    return os.path.basename(IMAGE_DIR)
+def _get_deck_prefix(deck_file: str) -> str:
+    """Extrae el nombre base del deck/verbo (e.g., 'go' de 'go.json')."""
+    return deck_file.replace(".json", "")
 
-def find_existing_image_path(card_index: int, def_index: int) -> Optional[str]:
-    # Construye el nombre del archivo con el prefijo del deck (ej. 'go_card_0_def0.jpg')
-    prefix = _get_deck_prefix()
-    base_filename = f"{prefix}_card_{card_index}_def{def_index}"
+# Índice de imágenes por directorio: (st_mtime_ns del directorio, nombres de archivo).
+# Añadir o borrar un archivo (también a mano) cambia el mtime del directorio, así
+# que un solo stat basta para validarlo; si cambió, se reconstruye con os.scandir.
+_IMAGE_INDEX: dict[str, tuple[int, set[str]]] = {}
+_IMAGE_INDEX_LOCK = threading.Lock()
+
+def _get_image_index(image_dir: str) -> set[str]:
+    """Retorna el conjunto de archivos de `image_dir`, re-escaneándolo solo si cambió."""
+    try:
+        mtime_ns = os.stat(image_dir).st_mtime_ns
+    except FileNotFoundError:
+        return set()
+    with _IMAGE_INDEX_LOCK:
+        entry = _IMAGE_INDEX.get(image_dir)
+    if entry and entry[0] == mtime_ns:
+        return entry[1]
+    with os.scandir(image_dir) as entries:
+        index = {e.name for e in entries if e.is_file()}
+    with _IMAGE_INDEX_LOCK:
+        _IMAGE_INDEX[image_dir] = (mtime_ns, index)
+    return index
+
+def find_existing_image_path(deck_file: str, card_index: int, def_index: int) -> Optional[str]:
+    # Construye el nombre del archivo con el prefijo del deck (ej. 'go_card_0_def0.jpg').
+    # Solo '.jpg': los '.jpeg' antiguos se renombran al arrancar (_prepare_image_dirs_sync)
+    prefix = _get_deck_prefix(deck_file)
+    filename = f"{prefix}_card_{card_index}_def{def_index}.jpg"
     
-    jpg_path = os.path.join(IMAGE_DIR, f"{base_filename}.jpg")
-    if os.path.exists(jpg_path):
-        return jpg_path
-    jpeg_path = os.path.join(IMAGE_DIR, f"{base_filename}.jpeg")
-    if os.path.exists(jpeg_path):
-        return jpeg_path
+    # Búsqueda en el índice en memoria (sin stat por archivo)
+    image_dir = _get_image_dir(deck_file)
+    if filename in _get_image_index(image_dir):
+        return os.path.join(image_dir, filename)
     return None
 
-def get_image_filepath(card_index: int, def_index: int) -> str:
+def get_image_filepath(deck_file: str, card_index: int, def_index: int) -> str:
     # Construye el nombre del archivo con el prefijo del deck (ej. 'go_card_0_def0.jpg')
-    prefix = _get_deck_prefix()
+    prefix = _get_deck_prefix(deck_file)
     filename = f"{prefix}_card_{card_index}_def{def_index}.jpg"
     
-    return os.path.join(IMAGE_DIR, filename)
+    return os.path.join(_get_image_dir(deck_file), filename)
+
+IMAGE_SKIPPED_MESSAGE = "Imagen no existe y la generación fue omitida (force_generation=False)."
 
-def generate_image_file(prompt: str, card_index: int, def_index: int, force_generation: bool) -> tuple[bool, str]:
-    existing_path = find_existing_image_path(card_index, def_index)
+def _prepare_image_dirs_sync():
+    """
+    Crea la carpeta de imágenes de cada deck y renombra los '.jpeg' históricos a
+    '.jpg', la única extensión que se busca y se genera. Se ejecuta al arrancar.
+    """
+    for filename in _list_available_json_files_sync():
+        image_dir = _get_image_dir(filename)
+        os.makedirs(image_dir, exist_ok=True)
+        with os.scandir(image_dir) as entries:
+            legacy = [e.path for e in entries if e.name.endswith(".jpeg") and e.is_file()]
+        for path in legacy:
+            target = path[:-len(".jpeg")] + ".jpg"
+            if os.path.exists(target):
+                # Ya había un .jpg (el que siempre tuvo prioridad): el .jpeg se deja
+                logging.warning(f"⚠️ {os.path.basename(path)} no se renombra: ya existe {os.path.basename(target)}")
+                continue
+            os.rename(path, target)
+            logging.info(f"🔁 Imagen renombrada a .jpg: {os.path.basename(target)}")
+
+def build_image_manifest(deck_file: str) -> Dict[int, List[int]]:
+    """
+    Retorna {card_index: [def_index, ...]} con las imágenes que ya existen para el deck.
+    Sale del mismo índice en memoria, en lugar de una consulta por tarjeta.
+    """
+    pattern = re.compile(rf"{re.escape(_get_deck_prefix(deck_file))}_card_(\d+)_def(\d+)\.jpg")
+    manifest: Dict[int, List[int]] = defaultdict(list)
+    for name in _get_image_index(_get_image_dir(deck_file)):
+        m = pattern.fullmatch(name)
+        if m:
+            manifest[int(m.group(1))].append(int(m.group(2)))
+    return {card: sorted(defs) for card, defs in sorted(manifest.items())}
+
+def generate_image_file(deck_file: str, prompt: str, card_index: int, def_index: int, force_generation: bool) -> tuple[bool, str]:
+    existing_path = find_existing_image_path(deck_file, card_index, def_index)
     
     if existing_path:
         logging.info(f"✅ Imagen ya existe: {os.path.basename(existing_path)}")
@@ -168,18 +253,27 @@ def generate_image_file(prompt: str, card_index: int, def_index: int, force_gene
     
     # LÓGICA DE CONTROL: Si la imagen NO existe y force_generation es False, salimos.
     if not force_generation:
-        return False, "Imagen no existe y la generación fue omitida (force_generation=False)."
+        return False, IMAGE_SKIPPED_MESSAGE
         
-    filepath = get_image_filepath(card_index, def_index)
+    filepath = get_image_filepath(deck_file, card_index, def_index)
     if not ia_model:
         return False, "Modelo de IA no disponible."
         
-    logging.info(f"🖼️ Generando imagen en '{IMAGE_DIR}' para: '{prompt[:80]}...'")
+    image_dir = os.path.dirname(filepath)
+    logging.info(f"🖼️ Generando imagen en '{image_dir}' para: '{prompt[:80]}...'")
     try:
         response = ia_model.generate_images(prompt=prompt, number_of_images=1, aspect_ratio="1:1")
         if not response.images:
             return False, "La API no devolvió ninguna imagen."
-        response.images[0].save(filepath)
+        image = response.images[0]
+        # Ya viene en JPEG: se escribe tal cual, sin decodificar ni recodificar con PIL
+        save_kwargs = {"include_generation_parameters": False} if image._image_bytes[:3] == b"\xff\xd8\xff" else {}
+        try:
+            image.save(filepath, **save_kwargs)
+        except FileNotFoundError:
+            # La carpeta del deck solo falta si el deck se añadió después del arranque
+            os.makedirs(image_dir, exist_ok=True)
+            image.save(filepath, **save_kwargs)
         logging.info(f"✅ Generación completada: {os.path.basename(filepath)}")
         return True, ""
     except (Timeout, ConnectionError) as e:
@@ -187,108 +281,273 @@ def generate_image_file(prompt: str, card_index: int, def_index: int, force_gene
     except Exception as e:
         return False, f"Error interno de la API de IA: {e}"
 
+# Cliente TTS asíncrono (gRPC aio), creado perezosamente en el loop que lo usa;
+# tts_client (síncrono, en threadpool) queda como respaldo.
+_tts_async_client = None
+_tts_async_loop = None
+
+def _get_tts_async_client():
+    """Retorna el cliente TTS asíncrono del loop actual (None si no se pudo crear)."""
+    global _tts_async_client, _tts_async_loop
+    loop = asyncio.get_running_loop()
+    if _tts_async_loop is not loop:
+        _tts_async_loop = loop
+        try:
+            _tts_async_client = texttospeech.TextToSpeechAsyncClient()
+        except Exception as e:
+            logging.warning(f"⚠️ TTS asíncrono no disponible, se usará el cliente síncrono: {e}")
+            _tts_async_client = None
+    return _tts_async_client
+
+def _discard_tmp_file(tmp_path: str):
+    """Borra un temporal que no llegó a os.replace (si aún existe)."""
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
+
+def _write_bytes_sync(filepath: str, content: bytes):
+    # Temporal + os.replace: un lector concurrente nunca ve un mp3 a medio escribir.
+    # Nombre único (mkstemp) en la misma carpeta: dos escrituras simultáneas del
+    # mismo archivo no comparten temporal y os.replace sigue siendo atómico.
+    directory = os.path.dirname(filepath)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    except FileNotFoundError:
+        # La carpeta ya existe casi siempre: solo se crea (y se reintenta) si falta
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(content)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        _discard_tmp_file(tmp_path)
+        raise
+
 def get_audio_filepath(text_hash: str) -> str:
     filename = f"{text_hash}.mp3"
     return os.path.join(AUDIO_DIR, filename)
 
-async def synthesize_speech_file(text: str, voice_name: str, model_name: Optional[str]) -> tuple[bool, str, str]:
+# Configuración de salida fija (MP3, 0.9x): un único mensaje protobuf para todas las síntesis
+_AUDIO_CONFIG = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3, speaking_rate=0.9)
+
+@lru_cache(maxsize=256)
+def _voice_selection(voice_name: str, model_name: Optional[str]) -> texttospeech.VoiceSelectionParams:
+    """VoiceSelectionParams por (voz, modelo), construido una sola vez (solo se lee)."""
+    voice_params = {"language_code": "en-US", "name": voice_name}
+    if model_name:
+        voice_params["model_name"] = model_name
+    return texttospeech.VoiceSelectionParams(**voice_params)
+
+@lru_cache(maxsize=4096)
+def _shape_tts_text(text: str) -> str:
+    """Texto que se envía a TTS; memoizado porque el vocabulario de los decks se repite."""
     original_text = text.strip()
     # Añadir un prefijo para mejor pronunciación si es una frase corta
-    text_to_synthesize = f"The word is: {original_text}" if len(original_text.split()) <= 2 and len(original_text) <= 10 else original_text
+    return f"The word is: {original_text}" if len(original_text.split()) <= 2 and len(original_text) <= 10 else original_text
+
+def _tts_cache_lookup(text: str, voice_name: str, model_name: Optional[str]) -> tuple[str, str, Optional[os.stat_result]]:
+    """
+    Retorna (texto a sintetizar, ruta del mp3, stat del mp3 o None si no está en caché).
+    Solo strip + hash + un stat: no construye ningún objeto de la API de TTS.
+    """
+    text_to_synthesize = _shape_tts_text(text)
     
     unique_key = f"{text_to_synthesize}|{voice_name}|{model_name or ''}"
+    # sha256: es el nombre de los mp3 ya guardados en AUDIO_DIR, no cambiarlo
     text_hash = hashlib.sha256(unique_key.encode("utf-8")).hexdigest()
     filepath = get_audio_filepath(text_hash)
-    
-    if os.path.exists(filepath):
-        return True, filepath, ""
-        
-    if not tts_client:
-        return False, "", "Cliente TTS no disponible."
+    try:
+        return text_to_synthesize, filepath, os.stat(filepath)
+    except FileNotFoundError:
+        return text_to_synthesize, filepath, None
+
+async def _synthesize_audio(text_to_synthesize: str, voice_name: str, model_name: Optional[str]) -> tuple[bool, bytes, str]:
+    """Sintetiza `text_to_synthesize` con la API de TTS. Retorna (success, mp3, error_message)."""
+    tts_async_client = _get_tts_async_client()
+    if not tts_async_client and not tts_client:
+        return False, b"", "Cliente TTS no disponible."
         
     try:
         synthesis_input = texttospeech.SynthesisInput(text=text_to_synthesize)
-        voice_params = {"language_code": "en-US", "name": voice_name}
-        if model_name:
-            voice_params["model_name"] = model_name
-            
-        voice = texttospeech.VoiceSelectionParams(**voice_params)
-        audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3, speaking_rate=0.9)
+        voice = _voice_selection(voice_name, model_name)
+        audio_config = _AUDIO_CONFIG
         
-        # Uso de run_in_threadpool para la llamada de Vertex AI TTS (operación de red bloqueante)
-        response = await run_in_threadpool(tts_client.synthesize_speech, input=synthesis_input, voice=voice, audio_config=audio_config)
-        
-        with open(filepath, "wb") as out:
-            out.write(response.audio_content)
+        if tts_async_client:
+            # Llamada gRPC asíncrona: no ocupa un hilo mientras espera a la API
+            response = await tts_async_client.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
+        else:
+            # Uso de run_in_threadpool para la llamada de Vertex AI TTS (operación de red bloqueante)
+            response = await run_in_threadpool(tts_client.synthesize_speech, input=synthesis_input, voice=voice, audio_config=audio_config)
             
-        return True, filepath, ""
+        return True, response.audio_content, ""
         
     except Exception as e:
-        return False, "", f"Error de síntesis de voz: {e}."
+        return False, b"", f"Error de síntesis de voz: {e}."
 
 # ----------------------------------------------------------------------
 # --- FUNCIONES SINCRONAS DE GESTIÓN DE ARCHIVOS JSON ---
 # ----------------------------------------------------------------------
 
+# Listado de JSONs: (st_mtime_ns del directorio, nombres). Igual que _IMAGE_INDEX,
+# un stat del directorio basta para saber si hay que volver a listarlo.
+_JSON_FILES_CACHE: Optional[tuple[int, List[str]]] = None
+
 def _list_available_json_files_sync() -> List[str]:
     """Lista todos los archivos JSON en el directorio de datos."""
-    if not JSON_DIR_PATH.exists():
+    global _JSON_FILES_CACHE
+    try:
+        mtime_ns = os.stat(JSON_DIR_PATH).st_mtime_ns
+    except FileNotFoundError:
         return []
-    # Retorna solo los nombres de los archivos .json
-    return [p.name for p in JSON_DIR_PATH.glob("*.json")]
-
-def _set_active_json_file_sync(filename: str):
-    """Establece el nombre del archivo JSON activo y el directorio de imágenes correspondiente."""
-    global FLASHCARDS_FILE_NAME
-    # Permite pasar el nombre sin extensión, ya que se asume que proviene del deck parameter
-    file_with_ext = filename if filename.endswith(".json") else f"{filename}.json" 
-    full_path = JSON_DIR_PATH / file_with_ext
+    cached = _JSON_FILES_CACHE
+    if cached and cached[0] == mtime_ns:
+        return list(cached[1])
+    # Una sola pasada con os.scandir: el tipo de cada entrada viene del propio
+    # listado del directorio, sin stat adicional ni objetos Path por archivo.
+    with os.scandir(JSON_DIR_PATH) as entries:
+        # Retorna solo los nombres de los archivos .json
+        files = [e.name for e in entries if e.name.endswith(".json") and e.is_file()]
+    _JSON_FILES_CACHE = (mtime_ns, files)
+    return list(files)
+
+def _resolve_deck_file_sync(deck: Optional[str]) -> str:
+    """
+    Retorna el nombre de archivo del deck pedido, comprobando que exista.
+    Sin deck se usa el deck por defecto o, si no existe, el primero disponible.
+    """
+    file_name = _deck_file_name(deck)
+    if (JSON_DIR_PATH / file_name).exists():
+        return file_name
+    if deck:
+        raise FileNotFoundError(f"El archivo '{file_name}' no existe.")
     
-    if not full_path.exists():
-        raise FileNotFoundError(f"El archivo '{file_with_ext}' no existe.")
-        
-    FLASHCARDS_FILE_NAME = file_with_ext
-    _set_dynamic_image_dir(file_with_ext) # LLAMADA PARA CREAR Y ESTABLECER EL NUEVO DIRECTORIO
-    logging.info(f"✅ Archivo JSON activo cambiado a: {FLASHCARDS_FILE_NAME}")
+    available_files = _list_available_json_files_sync()
+    if not available_files:
+        raise FileNotFoundError("Archivo de datos no encontrado y no hay JSONs disponibles.")
+    logging.warning(f"⚠️ Archivo principal '{file_name}' no encontrado. Usando: {available_files[0]}")
+    return available_files[0]
 
-def _get_flashcards_data_sync():
-    """Lee y retorna todos los datos del archivo JSON actualmente activo."""
-    current_path = get_current_flashcards_path()
+async def _image_deck_file(deck: Optional[str]) -> str:
+    """
+    Deck de una petición de imagen. El frontend incluido no envía 'deck': sin él
+    se resuelve el deck por defecto (o el primero disponible) como en update-status;
+    si no hay ningún JSON, se queda el nombre por defecto. Con deck no hay I/O.
+    """
+    if deck:
+        return _deck_file_name(deck)
+    try:
+        return await run_in_threadpool(_resolve_deck_file_sync, None)
+    except FileNotFoundError:
+        return _deck_file_name(None)
+
+def _read_deck_json_sync(path: Path, size: int) -> list:
+    """
+    Parsea un deck con orjson. Los grandes se leen con mmap y orjson parsea
+    directamente desde la caché de páginas, sin copiarlos antes a un bytes.
+    """
+    with open(path, "rb") as f:
+        if size < MMAP_MIN_DECK_SIZE:
+            return orjson.loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
+
+def _get_flashcards_data_sync(deck_file: str):
+    """Lee y retorna todos los datos del archivo JSON del deck indicado."""
+    current_path = JSON_DIR_PATH / deck_file
     
-    if not current_path.exists():
-        available_files = _list_available_json_files_sync()
-        if not available_files:
-            raise FileNotFoundError("Archivo de datos no encontrado y no hay JSONs disponibles.")
-        
-        global FLASHCARDS_FILE_NAME
-        FLASHCARDS_FILE_NAME = available_files[0]
-        current_path = get_current_flashcards_path()
-        logging.warning(f"⚠️ Archivo principal '{current_path.name}' no encontrado. Usando: {FLASHCARDS_FILE_NAME}")
+    st = os.stat(current_path)
+    mtime_ns = st.st_mtime_ns
+    with _FLASHCARDS_CACHE_LOCK:
+        entry = _FLASHCARDS_CACHE.get(current_path.name)
+    if entry and entry[0] == mtime_ns:
+        return entry[1]
     
-    with open(current_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    data = _read_deck_json_sync(current_path, st.st_size)
+    with _FLASHCARDS_CACHE_LOCK:
+        _FLASHCARDS_CACHE[current_path.name] = (mtime_ns, data)
+    return data
 
-def _update_card_status_sync(index: int, learned: bool):
-    """Actualiza el estado 'learned' de una tarjeta por índice."""
-    data = _get_flashcards_data_sync()
+def _write_deck_file_sync(path: Path, data: list, keep_cache_on_error: bool = False):
+    """
+    Escribe un deck de forma atómica (archivo temporal + os.replace) y refresca
+    su entrada en la caché. Si falla, la copia en memoria se descarta salvo con
+    `keep_cache_on_error` (el flusher la conserva mientras reintenta).
+    """
+    tmp_path = None
+    try:
+        # Temporal con nombre único: dos guardados simultáneos no se pisan el archivo
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path:
+            _discard_tmp_file(tmp_path)
+        if not keep_cache_on_error:
+            # La copia en memoria ya está modificada pero el disco no: se descarta
+            with _FLASHCARDS_CACHE_LOCK:
+                _FLASHCARDS_CACHE.pop(path.name, None)
+        raise
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _FLASHCARDS_CACHE_LOCK:
+        _FLASHCARDS_CACHE[path.name] = (mtime_ns, data)
+
+def _write_flashcards_data_sync(deck_file: str, data: list):
+    """Escribe el deck en disco en el acto (incluye sus cambios pendientes)."""
+    current_path = JSON_DIR_PATH / deck_file
+    with _FLASHCARDS_CACHE_LOCK:
+        _DIRTY_DECKS.pop(current_path.name, None)
+    _write_deck_file_sync(current_path, data)
+
+def _flush_dirty_decks_sync():
+    """Escribe a disco todos los decks con cambios de estado pendientes."""
+    with _FLASHCARDS_CACHE_LOCK:
+        pending = list(_DIRTY_DECKS.items())
+        _DIRTY_DECKS.clear()
+    for filename, data in pending:
+        try:
+            _write_deck_file_sync(JSON_DIR_PATH / filename, data, keep_cache_on_error=True)
+            logging.info(f"💾 Cambios de estado guardados en {filename}")
+        except Exception as e:
+            # El cliente ya recibió un 200: el deck vuelve a quedar pendiente (salvo
+            # que haya llegado otro cambio más reciente) y se reintenta en el siguiente volcado
+            logging.error(f"❌ No se pudo guardar {filename}, se reintentará: {e}")
+            with _FLASHCARDS_CACHE_LOCK:
+                _DIRTY_DECKS.setdefault(filename, data)
+
+async def _dirty_decks_flusher():
+    """Tarea de fondo: cada FLUSH_INTERVAL segundos vuelca los decks modificados."""
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        if _DIRTY_DECKS:
+            await run_in_threadpool(_flush_dirty_decks_sync)
+
+def _update_card_status_sync(deck_file: str, index: int, learned: bool):
+    """
+    Actualiza el estado 'learned' de una tarjeta por índice.
+    Solo modifica la copia en memoria y marca el deck como pendiente: la
+    escritura a disco la agrupa el flusher de fondo.
+    """
+    data = _get_flashcards_data_sync(deck_file)
     if 0 <= index < len(data):
         data[index]['learned'] = learned
     else:
         raise IndexError("Índice fuera de rango.")
     
-    with open(get_current_flashcards_path(), "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    with _FLASHCARDS_CACHE_LOCK:
+        _DIRTY_DECKS[deck_file] = data
 
-def _reset_all_statuses_sync():
-    """Marca todas las tarjetas como 'not learned' para el archivo activo."""
-    data = _get_flashcards_data_sync()
+def _reset_all_statuses_sync(deck_file: str):
+    """Marca todas las tarjetas como 'not learned' para el deck indicado."""
+    data = _get_flashcards_data_sync(deck_file)
     for card in data:
         card['learned'] = False
         if 'imagePath' in card:
              card['imagePath'] = None 
              
-    with open(get_current_flashcards_path(), "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    _write_flashcards_data_sync(deck_file, data)
 
 # ----------------------------------------------------------------------
 # --- ENDPOINTS ---
@@ -298,11 +557,11 @@ def _reset_all_statuses_sync():
 @app.get("/api/available-flashcards-files")
 async def get_available_flashcards_files():
     """
-    Retorna la lista de todos los archivos JSON disponibles y el activo.
+    Retorna la lista de todos los archivos JSON disponibles y el deck por defecto.
     """
     try:
         file_list = await run_in_threadpool(_list_available_json_files_sync)
-        return JSONResponse({"success": True, "files": file_list, "active_file": FLASHCARDS_FILE_NAME})
+        return ORJSONResponse({"success": True, "files": file_list, "active_file": DEFAULT_FLASHCARDS_FILE_NAME})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"No se pudieron listar los archivos: {e}")
 
@@ -310,16 +569,13 @@ async def get_available_flashcards_files():
 @app.get("/api/flashcards-data")
 async def get_flashcards_data(deck: Optional[str] = Query(None)):
     """
-    Retorna los datos de las tarjetas. Si se proporciona 'deck', cambia el archivo activo.
+    Retorna los datos de las tarjetas del deck indicado (o del deck por defecto).
     """
     try:
-        # 1. Cambiar el archivo activo si se proporciona el parámetro 'deck'
-        if deck:
-            await run_in_threadpool(_set_active_json_file_sync, deck)
-            
-        # 2. Cargar los datos del archivo ACTIVO
-        data = await run_in_threadpool(_get_flashcards_data_sync)
-        return JSONResponse(data)
+        # El deck se resuelve por petición: no hay estado "activo" compartido
+        deck_file = await run_in_threadpool(_resolve_deck_file_sync, deck)
+        data = await run_in_threadpool(_get_flashcards_data_sync, deck_file)
+        return ORJSONResponse(data)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"Archivo de deck no encontrado: {deck}.json")
     except Exception as e:
@@ -328,11 +584,14 @@ async def get_flashcards_data(deck: Optional[str] = Query(None)):
 @app.post('/api/update-status')
 async def update_card_status(request_data: UpdateStatusRequest):
     """
-    Actualiza el estado de la tarjeta para el archivo activo.
+    Actualiza el estado de la tarjeta para el deck indicado.
     """
     try:
-        await run_in_threadpool(_update_card_status_sync, request_data.index, request_data.learned)
-        return JSONResponse({"success": True, "message": f"Tarjeta {request_data.index} actualizada."})
+        deck_file = await run_in_threadpool(_resolve_deck_file_sync, request_data.deck)
+        await run_in_threadpool(_update_card_status_sync, deck_file, request_data.index, request_data.learned)
+        return ORJSONResponse({"success": True, "message": f"Tarjeta {request_data.index} actualizada."})
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Deck no encontrado: {request_data.deck}")
     except IndexError:
         raise HTTPException(status_code=404, detail="Índice fuera de rango.")
     except Exception as e:
@@ -344,40 +603,60 @@ async def reset_all_statuses(request_data: ResetRequest):
     Resetea el estado de todas las tarjetas para el deck especificado.
     """
     try:
-        # 1. Asegura que el archivo correcto esté activo y actualiza la carpeta de imágenes
-        await run_in_threadpool(_set_active_json_file_sync, request_data.deck)
+        deck_file = await run_in_threadpool(_resolve_deck_file_sync, request_data.deck)
+        await run_in_threadpool(_reset_all_statuses_sync, deck_file)
         
-        # 2. Resetea el progreso
-        await run_in_threadpool(_reset_all_statuses_sync)
-        
-        return JSONResponse({"success": True, "message": f"Todas las tarjetas en '{request_data.deck}' reseteadas."})
+        return ORJSONResponse({"success": True, "message": f"Todas las tarjetas en '{request_data.deck}' reseteadas."})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"Deck no encontrado para reset: {request_data.deck}.json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al resetear: {e}")
 
 # --- GENERACIÓN DE CONTENIDO ---
+@app.get("/api/image-manifest")
+async def get_image_manifest(deck: Optional[str] = Query(None)):
+    """
+    Retorna qué imágenes existen en el deck ({card_index: [def_index, ...]}),
+    para no sondear /api/generate-image tarjeta por tarjeta al cargarlo.
+    """
+    try:
+        deck_file = await run_in_threadpool(_resolve_deck_file_sync, deck)
+        manifest = await run_in_threadpool(build_image_manifest, deck_file)
+        return ORJSONResponse(manifest)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Archivo de deck no encontrado: {deck}.json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"No se pudo listar las imágenes: {e}")
+
 @app.post('/api/generate-image')
 async def generate_image_api(request_data: GenerateRequest):
     
     # 1. Calcular el nombre de archivo y subdirectorio ESPERADOS
-    subdir = os.path.basename(IMAGE_DIR)
-    expected_filepath = get_image_filepath(request_data.index, request_data.def_index)
+    deck_file = await _image_deck_file(request_data.deck)
+    subdir = _get_deck_prefix(deck_file)
+    expected_filepath = get_image_filepath(deck_file, request_data.index, request_data.def_index)
     expected_filename = os.path.basename(expected_filepath)
     expected_path = f"/card_images/{subdir}/{expected_filename}"
 
     # 2. Llamar a la lógica de generación/búsqueda
-    success, error_message = await run_in_threadpool(
-        generate_image_file, 
-        request_data.prompt, 
-        request_data.index, 
-        request_data.def_index, 
-        request_data.force_generation
-    )
+    if not request_data.force_generation:
+        # Solo sondeo: se responde desde el índice en memoria (un stat del directorio),
+        # sin pasar por el threadpool; las imágenes que faltan dan 404 desde RAM
+        found = find_existing_image_path(deck_file, request_data.index, request_data.def_index)
+        success, error_message = (True, "") if found else (False, IMAGE_SKIPPED_MESSAGE)
+    else:
+        success, error_message = await run_in_threadpool(
+            generate_image_file, 
+            deck_file,
+            request_data.prompt, 
+            request_data.index, 
+            request_data.def_index, 
+            request_data.force_generation
+        )
     
     if success:
         # CASO A: Imagen encontrada o generada con éxito (200 OK)
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True, 
             "filename": expected_filename, 
             "path": expected_path
@@ -388,7 +667,7 @@ async def generate_image_api(request_data: GenerateRequest):
         # Devuelve 404 si la imagen no existe y la generación fue omitida
         if "omitida" in error_message:
             # Retorna 404 pero incluye el nombre del archivo esperado en el cuerpo (para copia manual)
-            return JSONResponse(
+            return ORJSONResponse(
                 content={
                     "success": False,
                     "message": error_message,
@@ -403,22 +682,40 @@ async def generate_image_api(request_data: GenerateRequest):
 
 @app.delete('/api/delete-image')
 async def delete_image_api(request_data: DeleteRequest):
-    path_to_delete = find_existing_image_path(request_data.index, request_data.def_index)
+    deck_file = await _image_deck_file(request_data.deck)
+    path_to_delete = await run_in_threadpool(
+        find_existing_image_path, deck_file, request_data.index, request_data.def_index
+    )
     if not path_to_delete:
-        return JSONResponse({"success": True, "message": "Archivo no encontrado."})
+        return ORJSONResponse({"success": True, "message": "Archivo no encontrado."})
     try:
         os.remove(path_to_delete)
-        return JSONResponse({"success": True, "message": "Imagen eliminada."})
+        return ORJSONResponse({"success": True, "message": "Imagen eliminada."})
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"Error al eliminar: {e}")
 
 @app.post("/api/synthesize-speech")
 async def synthesize_speech_api(request_data: SynthesizeRequest):
-    success, filepath, error_message = await synthesize_speech_file(request_data.text, request_data.voice_name, request_data.model_name)
-    if success:
-        return FileResponse(filepath, media_type="audio/mpeg", filename=os.path.basename(filepath))
-    else:
-        raise HTTPException(status_code=500, detail=error_message)
+    # Caché primero: en un acierto solo se calcula el hash y se hace un stat
+    text_to_synthesize, filepath, st = _tts_cache_lookup(request_data.text, request_data.voice_name, request_data.model_name)
+    filename = os.path.basename(filepath)
+    if st is None:
+        success, audio_content, error_message = await _synthesize_audio(
+            text_to_synthesize, request_data.voice_name, request_data.model_name
+        )
+        if not success:
+            raise HTTPException(status_code=500, detail=error_message)
+        # El mp3 se envía desde memoria y se guarda en caché cuando ya salió la
+        # respuesta: el cliente no espera la escritura + stat + relectura del disco
+        return Response(
+            content=audio_content,
+            media_type="audio/mpeg",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            background=BackgroundTask(_write_bytes_sync, filepath, audio_content),
+        )
+    # Pasamos el stat ya hecho para que FileResponse no repita os.stat al enviar
+    # (el cuerpo se transmite con sendfile cuando el servidor lo soporta)
+    return FileResponse(filepath, media_type="audio/mpeg", filename=filename, stat_result=st)
 
 # Montar directorios estáticos y servir HTML
 app.mount(f"/{AUDIO_DIR}", StaticFiles(directory=AUDIO_DIR), name="audio")
@@ -426,13 +723,23 @@ app.mount(f"/{AUDIO_DIR}", StaticFiles(directory=AUDIO_DIR), name="audio")
 app.mount("/card_images", StaticFiles(directory=CARD_IMAGES_BASE_DIR), name="images") 
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+# Ruta resuelta una sola vez al importar
+_INDEX_HTML = BASE_DIR / STATIC_DIR / "flashcard_app.html"
+
 @app.get("/")
-async def serve_html():
-    html_path = BASE_DIR / STATIC_DIR / "flashcard_app.html"
-    if html_path.exists():
-        return FileResponse(html_path, media_type="text/html")
-    else:
+async def serve_html(request: Request):
+    # Un único stat (antes exists() + el stat de FileResponse)
+    try:
+        st = os.stat(_INDEX_HTML)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="No se encuentra el archivo HTML principal.")
+    response = FileResponse(_INDEX_HTML, media_type="text/html", stat_result=st)
+    # El navegador revalida con If-None-Match: si no cambió, 304 sin cuerpo
+    if request.headers.get("if-none-match") == response.headers["etag"]:
+        return Response(status_code=304, headers={"ETag": response.headers["etag"]})
+    return response
 
 if __name__ == '__main__':
-    uvicorn.run(app, host="0.0.0.0", port=8000, timeout_keep_alive=SERVER_TIMEOUT)
\ No newline at end of file
+    # Un solo proceso: las cachés de decks e imágenes viven en memoria del proceso
+    # uvloop y httptools cuando están instalados (uvloop no existe en Windows)
+    uvicorn.run(app, host="0.0.0.0", port=8000, timeout_keep_alive=SERVER_TIMEOUT, loop="auto", http="auto")
\ No newline at end of file
@@ -23,6 +23,58 @@ class Settings(BaseSettings):
     GCS_JSON_PREFIX: str = "json"
     GCS_IMAGES_PREFIX: str = "card_images"
     GCS_AUDIO_PREFIX: str = "card_audio"
+    # /card_audio: redirigir a la URL pública de GCS en lugar de hacer de proxy
+    # (requiere CORS en el bucket si el frontend descarga el audio con fetch)
+    AUDIO_REDIRECT_TO_GCS: bool = False
+    # Los mp3 llevan el hash de texto/voz/modelo en el nombre: nunca cambian
+    AUDIO_CACHE_MAX_AGE: int = 86400
+
+    # Caché en memoria de lecturas (segundos de vida por tipo de dato)
+    CATEGORIES_CACHE_TTL: int = 3600
+    DECK_LIST_CACHE_TTL: int = 300
+    PHONICS_CACHE_TTL: int = 86400
+    AUDIO_LOOKUP_CACHE_TTL: int = 600
+
+    # Máximo de subidas de imágenes procesándose a la vez
+    MAX_CONCURRENT_UPLOADS: int = 8
+
+    # Hilos del threadpool de anyio (handlers 'def' y run_in_threadpool)
+    THREADPOOL_SIZE: int = 80
+    # Conexiones HTTP reutilizables del cliente de GCS (una por hilo)
+    GCS_HTTP_POOL_SIZE: int = 80
+    # Descargas simultáneas en las lecturas por lotes (GCSHelper.download_many_as_bytes)
+    GCS_DOWNLOAD_WORKERS: int = 16
+    # Máximo de mp3 por respuesta de /audio-bulk
+    AUDIO_BULK_MAX_FILES: int = 500
+
+    # Compresión gzip de /flashcards-data y /phonics-data
+    GZIP_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESSLEVEL: int = 5
+
+    # Llamadas simultáneas a Imagen (Vertex AI); también hilos de /generate-images-bulk
+    IMAGE_GEN_MAX_CONCURRENCY: int = 4
+    # Máximo de items por petición a /generate-images-bulk y /delete-images-bulk
+    IMAGE_BULK_MAX_ITEMS: int = 50
+    # Calidad de las imágenes que hay que recodificar a JPEG (las que Imagen ya entrega en JPEG se suben tal cual)
+    JPEG_QUALITY: int = 82
+
+    # Llamadas simultáneas a Text-to-Speech y máximo de síntesis esperando turno (más -> 503)
+    TTS_MAX_CONCURRENCY: int = 8
+    TTS_MAX_QUEUE: int = 64
+
+    # Coalescencia de /update-status: espera (s) y máximo de cambios por escritura.
+    # Se suben tras responder: en Cloud Run desplegar con CPU siempre asignada
+    # (--no-cpu-throttling) o la subida puede quedarse congelada entre peticiones
+    STATUS_FLUSH_DELAY: float = 0.1
+    STATUS_FLUSH_MAX_BATCH: int = 50
+    # Espera máxima (s) entre reintentos de un lote que GCS rechazó
+    STATUS_FLUSH_MAX_BACKOFF: float = 30.0
+    # Cuánto esperan reset-all y el apagado a que se guarden los cambios en cola (s)
+    STATUS_FLUSH_WAIT_TIMEOUT: float = 10.0
+
+    # Procesos de uvicorn. Las cachés y la cola de estados viven en cada proceso
+    # y las escrituras de un deck no se coordinan entre ellos: subir con cuidado
+    WEB_CONCURRENCY: int = 1
     
     # Legacy local paths (kept for phonics data only)
     CARD_IMAGES_BASE_DIR: str = "card_images"
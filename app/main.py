@@ -1,16 +1,43 @@
 # Archivo: app/main.py
+import logging
+import os
+from contextlib import asynccontextmanager
+
+import anyio
 import uvicorn
-from fastapi import FastAPI, HTTPException, Response
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from google.cloud.exceptions import NotFound
+from starlette.concurrency import run_in_threadpool
 
 # Importamos la configuración y el router principal
 from app.core.config import settings
 from app.api.api import api_router
+from app.api.middleware import PathGZipMiddleware
+from app.api.responses import ORJSONResponse, file_etag_response
+from app.services import deck_service
 from app.services.gcs_helper import GCSHelper
 
-app = FastAPI(title="Flashcard AI API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los handlers 'def' y run_in_threadpool comparten el limitador de anyio
+    # (40 hilos por defecto): lo ampliamos porque casi todo es I/O contra GCS.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    # Un único cliente de GCS (con su pool de conexiones) para todo el proceso,
+    # creado aquí para que la primera petición no pague la inicialización
+    try:
+        await run_in_threadpool(GCSHelper.warm_up)
+    except Exception as e:
+        logging.warning(f"⚠️ No se pudo inicializar el cliente de GCS al arrancar: {e}")
+    yield
+    # Subir a GCS los cambios de estado que sigan encolados antes de salir
+    await deck_service.shutdown_status_flushers()
+    GCSHelper.close()
+
+# orjson como serializador por defecto para todas las respuestas JSON
+app = FastAPI(title="Flashcard AI API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # --- Middlewares (CORS) ---
 # Definimos los orígenes permitidos (Local + Producción)
@@ -31,6 +58,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión gzip solo para el HTML y los JSON grandes (deck completo y fonética)
+app.add_middleware(
+    PathGZipMiddleware,
+    paths=("/", "/api/flashcards-data", "/api/phonics-data"),
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    compresslevel=settings.GZIP_COMPRESSLEVEL,
+)
+
 # --- Montar Rutas de la API ---
 # Todas las rutas de 'api_router' ahora tendrán el prefijo /api
 app.include_router(api_router, prefix="/api")
@@ -40,15 +75,19 @@ app.include_router(api_router, prefix="/api")
 # Todos los archivos multimedia ahora se sirven desde Google Cloud Storage.
 
 # --- Ruta Principal (Servir HTML - Opcional si solo es API) ---
+# Ruta resuelta una sola vez al importar
+_INDEX_HTML = settings.BASE_DIR / settings.STATIC_DIR / "flashcard_app.html"
+
 @app.get("/")
-async def serve_html():
+async def serve_html(request: Request):
     # Nota: En producción con Frontend separado, esto es menos relevante,
     # pero lo dejamos por si quieres verificar que la API está viva.
-    html_path = settings.BASE_DIR / settings.STATIC_DIR / "flashcard_app.html"
-    if html_path.exists():
-        return FileResponse(html_path, media_type="text/html")
-    else:
+    # Un único stat (antes exists() + el stat de FileResponse); con ETag el navegador recibe 304
+    try:
+        st = os.stat(_INDEX_HTML)
+    except FileNotFoundError:
         return {"message": "Flashcard AI API is running 🚀"}
+    return file_etag_response(request, _INDEX_HTML, st, media_type="text/html")
 
 # --- REDIRECCIONES A GCS (Compatibilidad Frontend) ---
 
@@ -62,25 +101,43 @@ async def redirect_images(file_path: str):
 async def proxy_audio(file_path: str):
     """
     Proxy para archivos de audio desde GCS.
-    Descarga el archivo y lo sirve directamente para evitar problemas de CORS/Redirección en el navegador.
+    Transmite el archivo por trozos (en el threadpool) para evitar problemas de CORS/Redirección en el navegador.
+    Con AUDIO_REDIRECT_TO_GCS se redirige a GCS y el audio no pasa por la API.
     """
     print(f"🔍 Proxy Audio Request: {file_path}")
     blob_path = f"{settings.GCS_AUDIO_PREFIX}/{file_path}"
+    cache_headers = {"Cache-Control": f"public, max-age={settings.AUDIO_CACHE_MAX_AGE}"}
+    if settings.AUDIO_REDIRECT_TO_GCS:
+        gcs_url = f"https://storage.googleapis.com/{settings.GCS_BUCKET_NAME}/{blob_path}"
+        return RedirectResponse(url=gcs_url, headers=cache_headers)
     try:
-        # Descargar contenido (esto es rápido para archivos pequeños de audio)
-        audio_content = GCSHelper.download_blob_as_bytes(blob_path)
-        # print(f"✅ Proxy Audio Success: {len(audio_content)} bytes") # Comentado para no ensuciar logs en prod
-        return Response(content=audio_content, media_type="audio/mpeg")
+        # El primer trozo se descarga ya (sin consulta de metadatos previa):
+        # si el audio no existe falla aquí y se responde 404
+        chunks = await run_in_threadpool(GCSHelper.open_blob_chunks, blob_path)
+    except NotFound:
+        raise HTTPException(status_code=404, detail=f"Audio no encontrado: {file_path}")
     except Exception as e:
         print(f"❌ Proxy Audio Error: {e}")
         raise HTTPException(status_code=404, detail=f"Audio no encontrado: {e}")
+    # StreamingResponse consume el iterador síncrono en el threadpool
+    return StreamingResponse(
+        chunks,
+        media_type="audio/mpeg",
+        headers=cache_headers,
+    )
 
 # --- Ejecución (para desarrollo local) ---
 if __name__ == '__main__':
+    # Con varios workers no hay recarga automática (uvicorn no admite ambos)
+    workers = max(1, settings.WEB_CONCURRENCY)
     uvicorn.run(
         "app.main:app", 
         host="0.0.0.0", 
         port=8000, 
         timeout_keep_alive=settings.SERVER_TIMEOUT,
-        reload=True
+        workers=workers,
+        reload=workers == 1,
+        # uvloop y httptools cuando están instalados (uvloop no existe en Windows)
+        loop="auto",
+        http="auto",
     )
\ No newline at end of file
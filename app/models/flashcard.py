@@ -1,53 +1,97 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, List, Optional
+
+from app.core.config import settings
+
+# Categoría y deck acaban en rutas de GCS: solo letras, dígitos, '_' y '-'
+# (sin '/', '..' ni espacios). Se validan en el borde, antes de tocar GCS.
+CATEGORY_PATTERN = r"^[A-Za-z0-9_\-]{1,64}$"
+DECK_PATTERN = r"^[A-Za-z0-9_\-]{1,64}(\.json)?$"
+
+CategoryName = Annotated[str, StringConstraints(pattern=CATEGORY_PATTERN)]
+DeckName = Annotated[str, StringConstraints(pattern=DECK_PATTERN)]
+
+
+class _RequestModel(BaseModel):
+    """Base de los cuerpos de petición: inmutables y sin campos extra."""
+    model_config = ConfigDict(extra="ignore", frozen=True, str_strip_whitespace=True)
 
 
 # --- Modelos relacionados con DECKS ---
-class DeckRequest(BaseModel):
+class DeckRequest(_RequestModel):
     """Modelo para cargar un deck JSON."""
-    category: str  # <-- ¡AÑADIDO!
-    deck: str
+    category: CategoryName  # <-- ¡AÑADIDO!
+    deck: DeckName
 
 
-class ResetRequest(BaseModel):
+class ResetRequest(_RequestModel):
     """Modelo para resetear un deck."""
-    category: str  # <-- ¡AÑADIDO!
-    deck: str
+    category: CategoryName  # <-- ¡AÑADIDO!
+    deck: DeckName
     confirm: bool = False
 
 
-class UpdateStatusRequest(BaseModel):
+class UpdateStatusRequest(_RequestModel):
     """Modelo para actualizar el estado de una tarjeta."""
-    category: str  # <-- ¡AÑADIDO!
-    deck: str
+    category: CategoryName  # <-- ¡AÑADIDO!
+    deck: DeckName
     index: int
     learned: bool
 
 
 # --- Modelos relacionados con IMÁGENES ---
-class ImageGenerateRequest(BaseModel):
+class ImageGenerateRequest(_RequestModel):
     """Modelo para solicitar generación o carga de imagen."""
     prompt: str
-    category: str  # <-- ¡AÑADIDO!
-    deck: str
+    category: CategoryName  # <-- ¡AÑADIDO!
+    deck: DeckName
     index: int
     def_index: int
     force_generation: bool = False
 
 
-class ImageDeleteRequest(BaseModel):
+class ImageBulkItem(_RequestModel):
+    """Una tarjeta/definición dentro de una generación por lotes."""
+    prompt: str
+    index: int
+    def_index: int
+
+
+class ImageBulkGenerateRequest(_RequestModel):
+    """Modelo para generar (o recuperar) las imágenes de varias tarjetas de un deck."""
+    category: CategoryName
+    deck: DeckName
+    # Acotado: cada item puede ser una llamada facturable a Imagen
+    items: List[ImageBulkItem] = Field(..., max_length=settings.IMAGE_BULK_MAX_ITEMS)
+    force_generation: bool = False
+
+
+class ImageDeleteRequest(_RequestModel):
     """Modelo para solicitar eliminación de una imagen."""
-    category: str  # <-- ¡AÑADIDO!
-    deck: str
+    category: CategoryName  # <-- ¡AÑADIDO!
+    deck: DeckName
     index: int
     def_index: int
 
 
+class ImageBulkDeleteItem(_RequestModel):
+    """Una tarjeta/definición dentro de una eliminación por lotes."""
+    index: int
+    def_index: int
+
+
+class ImageBulkDeleteRequest(_RequestModel):
+    """Modelo para eliminar las imágenes de varias tarjetas de un deck."""
+    category: CategoryName
+    deck: DeckName
+    items: List[ImageBulkDeleteItem] = Field(..., max_length=settings.IMAGE_BULK_MAX_ITEMS)
+
+
 # --- Modelo relacionado con AUDIO ---
-class SynthesizeRequest(BaseModel):
+class SynthesizeRequest(_RequestModel):
     """Modelo para solicitar síntesis de texto a voz."""
-    category: str  # <-- ¡AÑADIDO!
-    deck: str
+    category: CategoryName  # <-- ¡AÑADIDO!
+    deck: DeckName
     text: str
     voice_name: str
     model_name: Optional[str] = None
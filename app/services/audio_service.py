@@ -1,8 +1,13 @@
+import io
 import os
+import asyncio
 import hashlib
 import logging
 import re
-from typing import Optional, Tuple
+import zipfile
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from cachetools import TTLCache
 from starlette.concurrency import run_in_threadpool
 from google.cloud import texttospeech
 from google.api_core.exceptions import InvalidArgument
@@ -11,26 +16,106 @@ from google.api_core.exceptions import InvalidArgument
 from app.core.config import settings, tts_client
 from app.services.gcs_helper import GCSHelper
 
+# Cliente TTS asíncrono (gRPC aio): las síntesis se esperan en el event loop sin
+# ocupar hilos del threadpool. Se crea perezosamente porque su canal queda ligado
+# al loop en el que nace; el cliente síncrono queda como respaldo.
+_tts_async_client: Optional[texttospeech.TextToSpeechAsyncClient] = None
+_tts_async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Síntesis en curso por petición idéntica: las llamadas concurrentes con los mismos
+# parámetros esperan la misma tarea (una sola consulta a GCS y una sola llamada a TTS)
+_inflight_syntheses: Dict[tuple, asyncio.Task] = {}
+
+# URL del último audio servido por petición idéntica: repetir la misma tarjeta no
+# toca GCS. TTL corto porque otra instancia puede regenerar la frase con otro tono
+_audio_url_cache = TTLCache(maxsize=2048, ttl=settings.AUDIO_LOOKUP_CACHE_TTL)
+
+# Tope de llamadas simultáneas a TTS: una ráfaga no acapara el threadpool (que
+# comparten las subidas a GCS); si además hay demasiadas esperando se responde 503
+_tts_semaphore = asyncio.Semaphore(settings.TTS_MAX_CONCURRENCY)
+_tts_waiting = 0
+
 
 # ============================================================
 # --- FUNCIONES AUXILIARES ---
 # ============================================================
 
 # --- ¡REFACTORIZADA PARA GCS! ---
+@lru_cache(maxsize=1024)
 def _get_audio_blob_prefix(category: str, deck_name: str) -> str:
     """Retorna el prefijo del blob en GCS para los archivos de audio de un deck."""
     folder_name = deck_name.replace(".json", "")
     return f"{settings.GCS_AUDIO_PREFIX}/{category}/{folder_name}"
 
 
+_SAFE_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789")
+
+class _SafeFilenameTable(dict):
+    """
+    Tabla para str.translate: a-z y 0-9 se conservan, los espacios
+    (todo carácter con str.isspace()) y '-' pasan a '_' y todo lo demás se elimina.
+    Cada carácter se resuelve una sola vez y queda guardado en la tabla.
+    """
+    def __missing__(self, codepoint: int):
+        char = chr(codepoint)
+        if char in _SAFE_CHARS:
+            value = codepoint
+        elif char.isspace() or char == "-":
+            value = "_"
+        else:
+            value = None
+        self[codepoint] = value
+        return value
+
+_SAFE_FILENAME_TABLE = _SafeFilenameTable()
+_UNDERSCORES_RE = re.compile(r"_+")
+_HEX_DIGITS = "0123456789abcdef"
+
+def _tone_from_suffix(suffix: str) -> Optional[str]:
+    """
+    Extrae el tono del resto del nombre de un mp3 tras '<deck>_<verbo>_<frase>_'
+    ('<tono>_<hash>.mp3'), o None si no tiene ese formato. El hash nunca lleva '_',
+    así que basta con partir por el último '_' (sin pasar por el motor de regex).
+    """
+    if not suffix.endswith(".mp3"):
+        return None
+    tone, sep, digest = suffix[:-4].rpartition("_")
+    if not (sep and tone and digest) or digest.strip(_HEX_DIGITS):
+        return None
+    return tone
+
+@lru_cache(maxsize=4096)
 def _to_safe_filename(text: str) -> str:
-    """Limpia una cadena para que sea segura en un nombre de archivo."""
-    safe_text = text.lower()
-    safe_text = re.sub(r"[^a-z0-9\s-]", "", safe_text)
-    safe_text = re.sub(r"[\s-]+", "_", safe_text)
+    """Limpia una cadena para que sea segura en un nombre de archivo (memoizada: tonos, verbos y frases se repiten)."""
+    # Una pasada en C con translate; solo queda colapsar los '_' seguidos
+    safe_text = text.lower().translate(_SAFE_FILENAME_TABLE)
+    safe_text = _UNDERSCORES_RE.sub("_", safe_text)
     return safe_text[:50].strip('_')
 
 
+# Configuración de salida fija (MP3, 0.9x): un único mensaje protobuf para todas las síntesis
+_AUDIO_CONFIG = texttospeech.AudioConfig(
+    audio_encoding=texttospeech.AudioEncoding.MP3,
+    speaking_rate=0.9
+)
+
+@lru_cache(maxsize=256)
+def _voice_selection(voice_name: str, model_name: Optional[str]) -> texttospeech.VoiceSelectionParams:
+    """VoiceSelectionParams por (voz, modelo), construido una sola vez (solo se lee)."""
+    voice_params = {"language_code": "en-US", "name": voice_name}
+    if model_name:
+        voice_params["model_name"] = model_name
+    return texttospeech.VoiceSelectionParams(**voice_params)
+
+
+@lru_cache(maxsize=4096)
+def _tts_hash(text: str, voice_name: str, model_name: str) -> str:
+    """Hash de 10 caracteres hex de texto + voz + modelo (memoizado: las frases se repiten)."""
+    unique_key_cache = f"{text}|{voice_name}|{model_name}".strip().lower()
+    # sha256 truncado: es el sufijo de los mp3 ya guardados en GCS, no cambiarlo
+    return hashlib.sha256(unique_key_cache.encode("utf-8")).hexdigest()[:10]
+
+
 # --- ¡REFACTORIZADA PARA GCS! ---
 def get_audio_blob_path(category: str, deck_name: str, filename: str) -> str:
     """Construye la ruta completa del blob en GCS para un archivo de audio."""
@@ -38,6 +123,21 @@ def get_audio_blob_path(category: str, deck_name: str, filename: str) -> str:
     return f"{prefix}/{filename}"
 
 
+def _get_tts_async_client() -> Optional[texttospeech.TextToSpeechAsyncClient]:
+    """Retorna el cliente TTS asíncrono del loop actual (None si no se pudo crear)."""
+    global _tts_async_client, _tts_async_loop
+    loop = asyncio.get_running_loop()
+    if _tts_async_loop is not loop:
+        _tts_async_loop = loop
+        try:
+            _tts_async_client = texttospeech.TextToSpeechAsyncClient()
+            logging.info("✅ Cliente Text-to-Speech asíncrono inicializado.")
+        except Exception as e:
+            logging.warning(f"⚠️ TTS asíncrono no disponible, se usará el cliente síncrono: {e}")
+            _tts_async_client = None
+    return _tts_async_client
+
+
 # ============================================================
 # --- FUNCIÓN PRINCIPAL ---
 # ============================================================
@@ -56,6 +156,39 @@ async def synthesize_speech_file(
     Genera (o reutiliza) un archivo de audio para la frase indicada y lo sube a GCS.
     Retorna (success, blob_path_or_url, error_message)
     """
+    key = (category, deck_name, text, voice_name, model_name, tone, verb_name)
+    cached_url = _audio_url_cache.get(key)
+    if cached_url is not None:
+        return True, cached_url, ""
+
+    task = _inflight_syntheses.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_synthesize_speech_file(*key))
+        _inflight_syntheses[key] = task
+        task.add_done_callback(lambda t: _inflight_syntheses.pop(key, None) if _inflight_syntheses.get(key) is t else None)
+    # shield: si un cliente cancela, la síntesis sigue para los demás que la esperan
+    result = await asyncio.shield(task)
+    if result[0]:
+        _audio_url_cache[key] = result[1]
+    return result
+
+
+def _forget_audio_url(url: str):
+    """Quita de la caché las peticiones que apuntaban a un audio ya borrado."""
+    for key in [k for k, v in list(_audio_url_cache.items()) if v == url]:
+        _audio_url_cache.pop(key, None)
+
+
+async def _synthesize_speech_file(
+    category: str,
+    deck_name: str,
+    text: str,
+    voice_name: str,
+    model_name: Optional[str],
+    tone: str,
+    verb_name: str,
+) -> Tuple[bool, str | None, str]:
+    """Implementación de `synthesize_speech_file` (sin deduplicar)."""
     gcs = GCSHelper()
     original_text = text.strip()
 
@@ -74,9 +207,7 @@ async def synthesize_speech_file(
     safe_text = _to_safe_filename(original_text)
 
     # 🔑 Hash único por texto + voz + modelo
-    hash_base_string = f"{original_text}|{voice_name}|{model_name or 'default_model'}"
-    unique_key_cache = hash_base_string.strip().lower()
-    current_hash = hashlib.sha256(unique_key_cache.encode("utf-8")).hexdigest()[:10]
+    current_hash = _tts_hash(original_text, voice_name, model_name or 'default_model')
 
     # Nombre del archivo final
     new_filename = f"{deck_prefix}_{safe_verb_name}_{safe_text}_{tone_prefix}_{current_hash}.mp3"
@@ -89,21 +220,28 @@ async def synthesize_speech_file(
     # --- VALIDACIÓN: EXISTE AUDIO DE LA MISMA FRASE EN GCS ---
     # ============================================================
     pattern = f"{deck_prefix}_{safe_verb_name}_{safe_text}_"
+
+    # El nombre queda determinado por frase+tono+voz+modelo: si ese blob ya existe,
+    # un solo HEAD basta (caso habitual) y no hace falta listar el deck
+    if await run_in_threadpool(gcs.blob_exists, blob_path_current):
+        logging.info(f"🔁 Audio existente en GCS: {new_filename} — reutilizando.")
+        return True, gcs.get_public_url(blob_path_current), ""
     
-    # Listar blobs con el prefijo del deck
-    existing_blobs = gcs.list_blobs_with_prefix(blob_prefix, extension=".mp3")
-    
-    # Filtrar por el patrón de la frase específica
-    matching_blobs = [blob for blob in existing_blobs if pattern in blob]
+    # Solo queda detectar "misma frase, otro tono": el patrón de la frase va como prefijo
+    # del listado (filtrado en GCS, no en Python) y basta con unos pocos resultados
+    matching_blobs = await run_in_threadpool(
+        gcs.list_blobs_with_prefix, f"{blob_prefix}/{pattern}", extension=".mp3", max_results=5
+    )
 
     if matching_blobs:
         # Tomamos el primer archivo encontrado (en GCS no tenemos timestamps fáciles)
         latest_blob = matching_blobs[0]
         filename = latest_blob.split("/")[-1]
 
-        # Extraer el tono actual del archivo existente
-        match = re.search(rf"{deck_prefix}_{safe_verb_name}_{safe_text}_(.+?)_[0-9a-f]+\.mp3$", filename)
-        tone_from_filename = match.group(1).replace("_", " ") if match else "default"
+        # Extraer el tono actual del archivo existente: el listado ya filtró por
+        # `pattern`, así que basta con analizar lo que viene detrás
+        tone = _tone_from_suffix(filename[len(pattern):]) if filename.startswith(pattern) else None
+        tone_from_filename = tone.replace("_", " ") if tone else "default"
 
         logging.info(f"🎧 Audio existente encontrado en GCS: {filename} (tono: {tone_from_filename})")
 
@@ -113,40 +251,56 @@ async def synthesize_speech_file(
             return True, gcs.get_public_url(latest_blob), ""
         else:
             logging.info(f"⚠️ Misma frase pero tono distinto ('{tone_from_filename}' → '{tone_prefix}') — regenerando.")
-            gcs.delete_blob(latest_blob)
+            await run_in_threadpool(gcs.delete_blob, latest_blob)
+            _forget_audio_url(gcs.get_public_url(latest_blob))
             logging.info(f"🗑️ Eliminado audio anterior de GCS: {filename}")
 
     # ============================================================
     # --- GENERACIÓN NUEVA ---
     # ============================================================
 
-    if not tts_client:
+    tts_async_client = _get_tts_async_client()
+    if not tts_async_client and not tts_client:
         logging.error("❌ Cliente Text-to-Speech no inicializado.")
         return False, None, "Cliente TTS no disponible."
 
+    global _tts_waiting
+    if _tts_semaphore.locked() and _tts_waiting >= settings.TTS_MAX_QUEUE:
+        logging.warning(f"⚠️ Cola de TTS llena ({_tts_waiting} en espera): se rechaza {new_filename}")
+        return False, None, "Error 503: Servicio de voz saturado, inténtalo de nuevo en unos segundos."
+
     logging.info(f"🎤 Generando nuevo audio: {new_filename}")
 
     try:
         synthesis_input = texttospeech.SynthesisInput(text=text_to_synthesize)
-        voice_params = {"language_code": "en-US", "name": voice_name}
-        if model_name:
-            voice_params["model_name"] = model_name
-
-        voice = texttospeech.VoiceSelectionParams(**voice_params)
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3,
-            speaking_rate=0.9
-        )
+        voice = _voice_selection(voice_name, model_name)
+        audio_config = _AUDIO_CONFIG
 
-        response = await run_in_threadpool(
-            tts_client.synthesize_speech,
-            input=synthesis_input,
-            voice=voice,
-            audio_config=audio_config
-        )
+        _tts_waiting += 1
+        try:
+            await _tts_semaphore.acquire()
+        finally:
+            _tts_waiting -= 1
+        try:
+            if tts_async_client:
+                response = await tts_async_client.synthesize_speech(
+                    input=synthesis_input,
+                    voice=voice,
+                    audio_config=audio_config
+                )
+            else:
+                response = await run_in_threadpool(
+                    tts_client.synthesize_speech,
+                    input=synthesis_input,
+                    voice=voice,
+                    audio_config=audio_config
+                )
+        finally:
+            _tts_semaphore.release()
 
-        # Subir audio directamente a GCS
-        success = gcs.upload_blob_from_bytes(
+        # Subir audio directamente a GCS (sin bloquear el event loop)
+        success = await run_in_threadpool(
+            gcs.upload_blob_from_bytes,
             blob_path_current, 
             response.audio_content, 
             content_type="audio/mpeg"
@@ -165,3 +319,30 @@ async def synthesize_speech_file(
     except Exception as e:
         logging.error(f"❌ Error general al generar audio: {e}")
         return False, None, f"Error de síntesis de voz: {e}"
+
+
+# ============================================================
+# --- DESCARGA POR LOTES (PRECARGA DE UN DECK) ---
+# ============================================================
+
+def build_deck_audio_zip(category: str, deck_name: str) -> Tuple[int, bytes]:
+    """
+    Empaqueta en un ZIP los mp3 ya generados de un deck (hasta AUDIO_BULK_MAX_FILES).
+    Las descargas desde GCS van en paralelo. Retorna (número de archivos, zip).
+    """
+    gcs = GCSHelper()
+    # Barra final: 'deck/' no debe coincidir también con 'deck-2/'
+    blob_prefix = f"{_get_audio_blob_prefix(category, deck_name)}/"
+    blob_paths = gcs.list_blobs_with_prefix(blob_prefix, extension=".mp3", max_results=settings.AUDIO_BULK_MAX_FILES)
+    contents = gcs.download_many_as_bytes(blob_paths, max_workers=settings.GCS_DOWNLOAD_WORKERS)
+
+    buffer = io.BytesIO()
+    count = 0
+    # ZIP_STORED: el mp3 ya viene comprimido, deflate solo gastaría CPU
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for blob_path, data in contents.items():
+            if data is not None:
+                archive.writestr(blob_path.rpartition("/")[2], data)
+                count += 1
+    logging.info(f"📦 {count} audios empaquetados para {category}/{deck_name}")
+    return count, buffer.getvalue()
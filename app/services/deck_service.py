@@ -1,13 +1,82 @@
-import json
+import asyncio
+import hashlib
+import itertools
 import logging
-from typing import List, Dict, Any
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Hashable, Iterator, Optional
+
+import orjson
+from cachetools import LRUCache, TTLCache
+from google.api_core.exceptions import PreconditionFailed
+from google.cloud.exceptions import NotFound
+from starlette.concurrency import run_in_threadpool
 
 # Importamos la configuración central y el helper de GCS
 from app.core.config import settings
 from app.services.gcs_helper import GCSHelper
 
+# --- Cachés en memoria (por proceso) para las lecturas ---
+# El inventario de decks y la fonética cambian poco: los aciertos se sirven
+# sin tocar GCS ni re-parsear JSON. Las escrituras refrescan su entrada.
+_cache_lock = threading.Lock()
+_categories_cache = TTLCache(maxsize=1, ttl=settings.CATEGORIES_CACHE_TTL)
+_decks_cache = TTLCache(maxsize=128, ttl=settings.DECK_LIST_CACHE_TTL)
+# Deck ya serializado (generation, bytes JSON, huella): sirve mientras la
+# generation revalidada en GCS coincida, sin ningún trabajo de JSON
+_deck_payload_cache = LRUCache(maxsize=128)
+_phonics_cache = TTLCache(maxsize=1, ttl=settings.PHONICS_CACHE_TTL)
+
+# Copias parseadas de cada deck junto a la 'generation' de GCS con la que se
+# leyeron: un GET de metadatos basta para saber si siguen vigentes, sin volver
+# a descargar ni parsear el JSON. Las escrituras las actualizan en el sitio.
+_deck_store = LRUCache(maxsize=128)
+# Un lock por deck serializa los ciclos leer-modificar-subir sobre el mismo archivo
+_deck_locks: Dict[tuple[str, str], threading.Lock] = {}
+# Reintentos de un ciclo leer-modificar-subir cuando otro proceso escribió antes (412)
+_MAX_SAVE_ATTEMPTS = 3
+
+
+def _cache_get(cache: TTLCache, key: Hashable, namespace: str) -> Optional[Any]:
+    """Retorna el valor cacheado (o None) registrando el hit/miss."""
+    with _cache_lock:
+        value = cache.get(key)
+    logging.debug(f"💾 Cache {'HIT' if value is not None else 'MISS'} {namespace}:{key}")
+    return value
+
+
+def _cache_set(cache: TTLCache, key: Hashable, value: Any) -> None:
+    with _cache_lock:
+        cache[key] = value
+
+
+def _deck_cache_key(category: str, deck_name: str) -> tuple[str, str]:
+    """Normaliza la clave de caché de un deck ('get' y 'get.json' son el mismo)."""
+    filename = deck_name if deck_name.endswith(".json") else f"{deck_name}.json"
+    return category, filename
+
+
+def invalidate_listings(category: Optional[str] = None) -> None:
+    """
+    Descarta los listados cacheados (categorías y decks de `category`, o de todas)
+    para que la siguiente navegación vuelva a listar GCS. Para quien cree o borre decks.
+    """
+    with _cache_lock:
+        _categories_cache.clear()
+        if category is None:
+            _decks_cache.clear()
+        else:
+            _decks_cache.pop(category, None)
+
+
+def _deck_lock(category: str, deck_name: str) -> threading.Lock:
+    """Retorna el lock de escritura del deck (creándolo la primera vez)."""
+    with _cache_lock:
+        return _deck_locks.setdefault(_deck_cache_key(category, deck_name), threading.Lock())
+
+
 # --- ¡FUNCIÓN REFACTORIZADA PARA GCS! ---
-def list_categories() -> List[str]:
+def _list_categories_sync() -> List[str]:
     """Lista todas las categorías (carpetas virtuales) desde GCS, priorizando 'phrasal_verbs'."""
     gcs = GCSHelper()
     
@@ -37,24 +106,118 @@ def list_categories() -> List[str]:
     logging.info(f"Categorías encontradas en GCS: {categories}")
     return categories
 
+async def list_categories() -> List[str]:
+    """Versión async (y cacheada) de `_list_categories_sync`."""
+    categories = _cache_get(_categories_cache, "all", "categories")
+    if categories is None:
+        categories = await run_in_threadpool(_list_categories_sync)
+        _cache_set(_categories_cache, "all", categories)
+    return categories
+
 # --- ¡REFACTORIZADA PARA GCS! ---
-def _get_deck_blob_path(category: str, deck_name: str) -> str:
-    """Retorna la ruta del blob en GCS para un deck específico DENTRO de una categoría."""
-    filename = deck_name if deck_name.endswith(".json") else f"{deck_name}.json"
+def _load_deck_sync(category: str, deck_name: str) -> tuple[str, int, List[Dict[str, Any]]]:
+    """
+    Retorna (blob_path, generation, datos) de un deck DENTRO de una categoría.
+    Una sola descarga condicional a la 'generation' de la copia en memoria:
+    si el blob no cambió GCS responde 304 sin cuerpo y se reutiliza la copia;
+    si cambió, llega el contenido nuevo y se parsea.
+    """
+    key = _deck_cache_key(category, deck_name)
+    filename = key[1]
     
     # Construye la ruta del blob en GCS
     blob_path = f"{settings.GCS_JSON_PREFIX}/{category}/{filename}"
     
-    # Verificar que existe en GCS
+    with _cache_lock:
+        cached = _deck_store.get(key)
+    
     gcs = GCSHelper()
-    if not gcs.blob_exists(blob_path):
+    try:
+        generation, json_content = gcs.download_blob_if_modified(blob_path, cached[0] if cached is not None else None)
+    except NotFound:
         logging.warning(f"Blob de deck no encontrado en GCS: {blob_path}")
+        # El listado cacheado puede seguir ofreciendo un deck que ya no existe
+        invalidate_listings(category)
+        with _cache_lock:
+            _deck_store.pop(key, None)
         raise FileNotFoundError(f"El archivo del deck '{filename}' no existe en la categoría '{category}'.")
+    except Exception as e:
+        logging.error(f"Error al cargar deck desde GCS: {e}")
+        raise
     
-    return blob_path
+    if json_content is None:
+        logging.debug(f"💾 Deck vigente en memoria (generation {generation}): {blob_path}")
+        return blob_path, generation, cached[1]
+    
+    try:
+        # orjson parsea directamente los bytes (sin decode intermedio a str)
+        data = orjson.loads(json_content)
+    except orjson.JSONDecodeError:
+        logging.error(f"Error al decodificar JSON desde GCS: {blob_path}")
+        raise ValueError(f"No se pudo leer el archivo '{deck_name}.json'.")
+    
+    with _cache_lock:
+        _deck_store[key] = (generation, data)
+    return blob_path, generation, data
+
+def _save_deck_sync(category: str, deck_name: str, blob_path: str, generation: int, data: List[Dict[str, Any]], error_message: str) -> None:
+    """
+    Sube el deck modificado y refresca las copias en memoria con la nueva versión.
+    La subida exige que GCS siga en la `generation` leída: si otro proceso escribió
+    entre medias se propaga PreconditionFailed y no se pisa su cambio.
+    """
+    key = _deck_cache_key(category, deck_name)
+    gcs = GCSHelper()
+    # orjson serializa directo a bytes UTF-8 (se suben tal cual, sin re-codificar)
+    json_content = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    try:
+        generation = gcs.upload_blob_with_generation(
+            blob_path, json_content, content_type="application/json", if_generation_match=generation
+        )
+    except PreconditionFailed:
+        # Nuestra copia quedó atrás: se descarta para que el reintento lea la versión nueva
+        with _cache_lock:
+            _deck_payload_cache.pop(key, None)
+            _deck_store.pop(key, None)
+        raise
+    
+    with _cache_lock:
+        _deck_payload_cache.pop(key, None)
+        if generation is None:
+            # La copia en memoria ya se modificó pero GCS no: se descarta
+            _deck_store.pop(key, None)
+        else:
+            _deck_store[key] = (generation, data)
+    
+    if generation is None:
+        raise Exception(error_message)
+
+def _modify_deck_sync(category: str, deck_name: str, mutate: Callable[[List[Dict[str, Any]]], None], action: str, error_message: str) -> None:
+    """
+    Ciclo leer-modificar-subir de un deck bajo su lock. Si GCS rechaza la subida
+    porque el deck cambió (412), se relee y se vuelve a aplicar `mutate`
+    (hasta _MAX_SAVE_ATTEMPTS veces). `mutate` debe poder repetirse sin efectos extra.
+    """
+    with _deck_lock(category, deck_name):
+        for attempt in range(1, _MAX_SAVE_ATTEMPTS + 1):
+            try:
+                blob_path, generation, data = _load_deck_sync(category, deck_name)
+            except (FileNotFoundError, ValueError) as e:
+                logging.error(f"No se pudo cargar {category}/{deck_name} para {action}: {e}")
+                raise
+
+            mutate(data)
+
+            try:
+                _save_deck_sync(category, deck_name, blob_path, generation, data, f"{error_message}: {blob_path}")
+                return
+            except PreconditionFailed:
+                if attempt == _MAX_SAVE_ATTEMPTS:
+                    raise Exception(f"{error_message} (el deck cambió {attempt} veces durante la escritura): {blob_path}")
+                logging.warning(f"⚠️ {category}/{deck_name} cambió en GCS durante la escritura; reintentando ({attempt}/{_MAX_SAVE_ATTEMPTS})")
 
 # --- ¡REFACTORIZADA PARA GCS! ---
-def list_decks(category: str) -> List[str]:
+def _list_decks_sync(category: str) -> List[str]:
     """Lista todos los archivos JSON de decks disponibles DENTRO de una categoría desde GCS."""
     gcs = GCSHelper()
     prefix = f"{settings.GCS_JSON_PREFIX}/{category}/"
@@ -72,72 +235,218 @@ def list_decks(category: str) -> List[str]:
     logging.info(f"Decks encontrados en GCS para '{category}': {len(decks)}")
     return decks
 
+async def list_decks(category: str) -> List[str]:
+    """Versión async (y cacheada por categoría) de `_list_decks_sync`."""
+    decks = _cache_get(_decks_cache, category, "decks")
+    if decks is None:
+        decks = await run_in_threadpool(_list_decks_sync, category)
+        _cache_set(_decks_cache, category, decks)
+    return decks
+
 # --- ¡REFACTORIZADA PARA GCS! ---
-def get_deck_data(category: str, deck_name: str) -> List[Dict[str, Any]]:
+def _get_deck_data_sync(category: str, deck_name: str) -> List[Dict[str, Any]]:
     """Lee y retorna todos los datos de un deck específico desde GCS."""
-    blob_path = _get_deck_blob_path(category, deck_name)
+    return _load_deck_sync(category, deck_name)[2]
+
+async def get_deck_data(category: str, deck_name: str) -> List[Dict[str, Any]]:
+    """
+    Versión async de `_get_deck_data_sync` para los endpoints de lectura. Cada
+    lectura se revalida contra GCS (una descarga condicional) y, si el deck no
+    cambió, reutiliza la copia parseada de `_deck_store`. El resultado se comparte
+    entre peticiones: solo lo modifican los escritores de este módulo.
+    """
+    data = await run_in_threadpool(_get_deck_data_sync, category, deck_name)
+    _apply_pending_statuses(_deck_cache_key(category, deck_name), data)
+    return data
+
+async def get_deck_payload(category: str, deck_name: str) -> tuple[bytes, str]:
+    """
+    Igual que `get_deck_data` pero retorna el deck ya serializado a JSON (bytes),
+    listo para enviarse tal cual, junto a su huella (ETag). Ambos se calculan
+    una vez por generation del deck (los cambios locales descartan la entrada).
+    """
+    key = _deck_cache_key(category, deck_name)
+    _, generation, data = await run_in_threadpool(_load_deck_sync, category, deck_name)
+    cached = _cache_get(_deck_payload_cache, key, "flashcards-payload")
+    if cached is None or cached[0] != generation:
+        _apply_pending_statuses(key, data)
+        payload = orjson.dumps(data)
+        cached = (generation, payload, hashlib.blake2b(payload, digest_size=8).hexdigest())
+        _cache_set(_deck_payload_cache, key, cached)
+    return cached[1], cached[2]
+
+def _open_deck_stream_sync(category: str, deck_name: str) -> Iterator[bytes]:
+    """
+    Retorna un iterador con el JSON del deck tal como está guardado en GCS,
+    sin descargarlo entero ni parsearlo (fijado a la versión actual del blob).
+    El primer trozo se pide aquí mismo: confirma que el deck existe sin una
+    consulta de metadatos aparte.
+    """
+    category, filename = _deck_cache_key(category, deck_name)
+    blob_path = f"{settings.GCS_JSON_PREFIX}/{category}/{filename}"
+
     gcs = GCSHelper()
-    
     try:
-        json_content = gcs.download_blob_as_string(blob_path)
-        return json.loads(json_content)
-    except json.JSONDecodeError:
-        logging.error(f"Error al decodificar JSON desde GCS: {blob_path}")
-        raise ValueError(f"No se pudo leer el archivo '{deck_name}.json'.")
-    except Exception as e:
-        logging.error(f"Error al cargar deck desde GCS: {e}")
-        raise
+        return gcs.open_blob_chunks(blob_path)
+    except NotFound:
+        logging.warning(f"Blob de deck no encontrado en GCS: {blob_path}")
+        raise FileNotFoundError(f"El archivo del deck '{filename}' no existe en la categoría '{category}'.")
+
+async def open_deck_stream(category: str, deck_name: str) -> Iterator[bytes]:
+    """Versión async de `_open_deck_stream_sync` (la primera lectura va al threadpool)."""
+    return await run_in_threadpool(_open_deck_stream_sync, category, deck_name)
+
+# --- Escrituras coalescidas de /update-status ---
+# Cada clic encola un parche (seq, index, learned); un flusher por deck espera
+# STATUS_FLUSH_DELAY, junta hasta STATUS_FLUSH_MAX_BATCH parches y sube el JSON
+# UNA sola vez, en lugar de una reescritura completa del deck por clic.
+# La subida ocurre después de responder al cliente: en Cloud Run la CPU debe
+# seguir asignada fuera de las peticiones (ver Dockerfile).
+_status_queues: Dict[tuple[str, str], asyncio.Queue] = {}
+_status_flushers: Dict[tuple[str, str], asyncio.Task] = {}
+# Parches aceptados pero aún no guardados en GCS, por deck: index -> (seq, learned).
+# Se vuelven a aplicar sobre cada lectura (también si la copia en memoria se
+# descartó tras un fallo) hasta que una subida los confirme.
+_pending_statuses: Dict[tuple[str, str], Dict[int, tuple[int, bool]]] = {}
+_status_seq = itertools.count(1)
+
+def _apply_pending_statuses(key: tuple[str, str], data: List[Dict[str, Any]]) -> None:
+    """Aplica sobre `data` los cambios de estado de `key` que siguen sin guardarse."""
+    for index, (_, learned) in _pending_statuses.get(key, {}).items():
+        if 0 <= index < len(data):
+            data[index]['learned'] = learned
+
+def _forget_pending_statuses(key: tuple[str, str], saved_seq: int) -> None:
+    """Olvida los parches ya guardados (seq <= saved_seq); los más nuevos siguen pendientes."""
+    pending = _pending_statuses.get(key)
+    if pending is None:
+        return
+    for index in [i for i, (seq, _) in pending.items() if seq <= saved_seq]:
+        del pending[index]
+    if not pending:
+        del _pending_statuses[key]
 
 # --- ¡REFACTORIZADA PARA GCS! ---
-def update_card_status(category: str, deck_name: str, index: int, learned: bool):
-    """Actualiza el estado 'learned' de una tarjeta por índice en un deck en GCS."""
-    blob_path = _get_deck_blob_path(category, deck_name)
-    
-    try:
-        data = get_deck_data(category, deck_name)
-    except (FileNotFoundError, ValueError) as e:
-        logging.error(f"No se pudo cargar {category}/{deck_name} para actualizar: {e}")
-        raise
-        
-    if 0 <= index < len(data):
-        data[index]['learned'] = learned
-    else:
+def _apply_card_statuses_sync(category: str, deck_name: str, patches: List[tuple[int, bool]]):
+    """Aplica un lote de cambios de 'learned' y sube el deck a GCS una sola vez."""
+    def mutate(data: List[Dict[str, Any]]):
+        for index, learned in patches:
+            if 0 <= index < len(data):
+                data[index]['learned'] = learned
+
+    _modify_deck_sync(category, deck_name, mutate, "actualizar", "Error al actualizar el deck en GCS")
+
+async def _status_flusher(category: str, deck_name: str, queue: asyncio.Queue):
+    """
+    Tarea de fondo de un deck: agrupa los parches encolados y los guarda en lote.
+    Si la subida falla, el lote se conserva (en orden, delante de los nuevos) y se
+    reintenta con espera exponencial hasta STATUS_FLUSH_MAX_BACKOFF; mientras
+    tanto los cambios siguen visibles en las lecturas (`_pending_statuses`).
+    """
+    key = _deck_cache_key(category, deck_name)
+    patches: List[tuple[int, int, bool]] = []
+    failures = 0
+    while True:
+        if not patches:
+            patches.append(await queue.get())
+            # Ventana breve para que lleguen los clics siguientes
+            await asyncio.sleep(settings.STATUS_FLUSH_DELAY)
+        while len(patches) < settings.STATUS_FLUSH_MAX_BATCH and not queue.empty():
+            patches.append(queue.get_nowait())
+        try:
+            await run_in_threadpool(
+                _apply_card_statuses_sync, category, deck_name, [(index, learned) for _, index, learned in patches]
+            )
+            logging.info(f"💾 {len(patches)} cambio(s) de estado guardados en {category}/{deck_name}")
+        except (FileNotFoundError, ValueError) as e:
+            # El deck ya no existe o no se puede leer: reintentar no lo arregla
+            logging.error(f"❌ Se descartan {len(patches)} cambio(s) de estado en {category}/{deck_name}: {e}")
+        except Exception as e:
+            failures += 1
+            backoff = min(settings.STATUS_FLUSH_DELAY * 2 ** failures, settings.STATUS_FLUSH_MAX_BACKOFF)
+            logging.error(
+                f"❌ No se pudieron guardar {len(patches)} cambio(s) de estado en {category}/{deck_name}: {e}"
+                f" (reintento {failures} en {backoff:.1f}s)"
+            )
+            await asyncio.sleep(backoff)
+            continue
+        failures = 0
+        _forget_pending_statuses(key, patches[-1][0])
+        for _ in patches:
+            queue.task_done()
+        patches = []
+
+async def update_card_status(category: str, deck_name: str, index: int, learned: bool):
+    """
+    Actualiza el estado 'learned' de una tarjeta por índice.
+    El cambio se aplica al instante en la copia en memoria (las lecturas ya lo ven)
+    y se encola para que el flusher del deck lo suba a GCS junto con los siguientes.
+    """
+    data = await get_deck_data(category, deck_name)
+    if not 0 <= index < len(data):
         raise IndexError("Índice fuera de rango.")
-    
-    # Subir datos actualizados a GCS
-    gcs = GCSHelper()
-    json_content = json.dumps(data, indent=4, ensure_ascii=False)
-    success = gcs.upload_blob_from_string(blob_path, json_content, content_type="application/json")
-    
-    if not success:
-        raise Exception(f"Error al actualizar el deck en GCS: {blob_path}")
+    data[index]['learned'] = learned
+
+    key = _deck_cache_key(category, deck_name)
+    seq = next(_status_seq)
+    _pending_statuses.setdefault(key, {})[index] = (seq, learned)
+    with _cache_lock:
+        _deck_payload_cache.pop(key, None)
+    queue = _status_queues.get(key)
+    if queue is None:
+        queue = _status_queues[key] = asyncio.Queue()
+        _status_flushers[key] = asyncio.create_task(_status_flusher(*key, queue))
+    queue.put_nowait((seq, index, learned))
+
+async def wait_pending_statuses(category: str, deck_name: str):
+    """
+    Espera a que se suban los cambios de estado encolados de un deck. Si GCS sigue
+    fallando pasados STATUS_FLUSH_WAIT_TIMEOUT segundos, lanza una excepción
+    (los cambios siguen en cola y en memoria).
+    """
+    queue = _status_queues.get(_deck_cache_key(category, deck_name))
+    if queue is not None:
+        try:
+            await asyncio.wait_for(queue.join(), settings.STATUS_FLUSH_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise Exception(f"Hay cambios de estado sin guardar en {category}/{deck_name}; GCS no acepta la escritura.")
+
+async def shutdown_status_flushers():
+    """Sube los cambios pendientes de todos los decks y detiene los flushers (apagado)."""
+    for key, queue in list(_status_queues.items()):
+        try:
+            await asyncio.wait_for(queue.join(), settings.STATUS_FLUSH_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.error(f"❌ Apagado con {len(_pending_statuses.get(key, {}))} cambio(s) de estado sin guardar en {key[0]}/{key[1]}")
+    for task in _status_flushers.values():
+        task.cancel()
+    await asyncio.gather(*_status_flushers.values(), return_exceptions=True)
+    _status_queues.clear()
+    _status_flushers.clear()
 
 # --- ¡REFACTORIZADA PARA GCS! ---
-def reset_deck_status(category: str, deck_name: str):
+def _reset_deck_status_sync(category: str, deck_name: str):
     """Marca todas las tarjetas como 'not learned' para un deck en GCS."""
-    blob_path = _get_deck_blob_path(category, deck_name)
-    
-    try:
-        data = get_deck_data(category, deck_name)
-    except (FileNotFoundError, ValueError) as e:
-        logging.error(f"No se pudo cargar {category}/{deck_name} para resetear: {e}")
-        raise
+    def mutate(data: List[Dict[str, Any]]):
+        for card in data:
+            card['learned'] = False
+            # Resetea también el imagePath en *todas las definiciones*
+            # (asignar None es idempotente: no hace falta mirar el valor previo)
+            definitions = card.get('definitions')
+            if isinstance(definitions, list):
+                for definition in definitions:
+                    definition['imagePath'] = None
 
-    for card in data:
-        card['learned'] = False
-        # Resetea también el imagePath en *todas las definiciones*
-        if 'definitions' in card and isinstance(card['definitions'], list):
-            for i in range(len(card['definitions'])):
-                if card['definitions'][i].get('imagePath') is not None:
-                        card['definitions'][i]['imagePath'] = None 
-            
     # Subir datos reseteados a GCS
-    gcs = GCSHelper()
-    json_content = json.dumps(data, indent=4, ensure_ascii=False)
-    success = gcs.upload_blob_from_string(blob_path, json_content, content_type="application/json")
-    
-    if not success:
-        raise Exception(f"Error al resetear el deck en GCS: {blob_path}")
+    _modify_deck_sync(category, deck_name, mutate, "resetear", "Error al resetear el deck en GCS")
+
+async def reset_deck_status(category: str, deck_name: str):
+    """
+    Versión async de `_reset_deck_status_sync` (la descarga y la subida van al threadpool).
+    Los cambios de estado encolados se guardan antes, para no reordenar escrituras.
+    """
+    await wait_pending_statuses(category, deck_name)
+    await run_in_threadpool(_reset_deck_status_sync, category, deck_name)
 
 # --- ¡REFACTORIZADA PARA GCS! ---
 def update_image_path_in_card(category: str, deck_name: str, index: int, def_index: int, image_path: str | None):
@@ -145,41 +454,34 @@ def update_image_path_in_card(category: str, deck_name: str, index: int, def_ind
     Actualiza el 'imagePath' de una definición específica dentro de una tarjeta en el deck en GCS.
     Si image_path es None, borra la ruta.
     """
-    blob_path = _get_deck_blob_path(category, deck_name)
-    
-    try:
-        data = get_deck_data(category, deck_name)
-    except (FileNotFoundError, ValueError) as e:
-        logging.error(f"No se pudo cargar {category}/{deck_name} para actualizar imagen: {e}")
-        raise
-        
-    # Verificar que el índice de la tarjeta esté dentro de los límites
-    if 0 <= index < len(data):
-        card = data[index]
-        if 'definitions' in card and isinstance(card['definitions'], list):
-            defs = card['definitions']
-            # Verificar que el índice de la definición esté dentro de los límites
-            if 0 <= def_index < len(defs):
-                defs[def_index]['imagePath'] = image_path
+    def mutate(data: List[Dict[str, Any]]):
+        # Verificar que el índice de la tarjeta esté dentro de los límites
+        if 0 <= index < len(data):
+            card = data[index]
+            if 'definitions' in card and isinstance(card['definitions'], list):
+                defs = card['definitions']
+                # Verificar que el índice de la definición esté dentro de los límites
+                if 0 <= def_index < len(defs):
+                    defs[def_index]['imagePath'] = image_path
+                else:
+                    raise IndexError(f"Índice de definición ({def_index}) fuera de rango.")
             else:
-                raise IndexError(f"Índice de definición ({def_index}) fuera de rango.")
+                raise ValueError(f"La tarjeta en el índice {index} no tiene una lista de 'definitions'.")
         else:
-            raise ValueError(f"La tarjeta en el índice {index} no tiene una lista de 'definitions'.")
-    else:
-        raise IndexError(f"Índice de tarjeta ({index}) fuera de rango.")
-    
+            raise IndexError(f"Índice de tarjeta ({index}) fuera de rango.")
+
     # Subir datos actualizados a GCS
-    gcs = GCSHelper()
-    json_content = json.dumps(data, indent=4, ensure_ascii=False)
-    success = gcs.upload_blob_from_string(blob_path, json_content, content_type="application/json")
-    
-    if not success:
-        raise Exception(f"Error al actualizar imagen en deck en GCS: {blob_path}")
+    _modify_deck_sync(category, deck_name, mutate, "actualizar imagen", "Error al actualizar imagen en deck en GCS")
 
 
-# --- (SIN CAMBIOS) ---
-# Esta función es independiente y se queda como está.
-def get_phonics_data() -> List[Dict[str, Any]]:
+def _read_json_sync(path: Path) -> Any:
+    """Lee y parsea un archivo JSON local en una sola operación (open + read + parse)."""
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+# Esta función es independiente de GCS: lee un archivo local.
+def _get_phonics_data_sync() -> List[Dict[str, Any]]:
     """
     Carga y retorna el archivo JSON de fonética (phonics.json)
     desde su carpeta personalizada (static/phonics_audio/).
@@ -196,9 +498,16 @@ def get_phonics_data() -> List[Dict[str, Any]]:
     
     # 3. Lo leemos y devolvemos
     try:
-        with open(phonics_path, "r", encoding="utf-8") as f:
-            logging.info(f"Cargando {phonics_path} ...")
-            return json.load(f)
-    except json.JSONDecodeError as e:
+        logging.info(f"Cargando {phonics_path} ...")
+        return _read_json_sync(phonics_path)
+    except orjson.JSONDecodeError as e:
         logging.error(f"Error al leer o parsear phonics.json: {e}")
         raise ValueError("Error al procesar el archivo de fonética.")
+
+async def get_phonics_data() -> List[Dict[str, Any]]:
+    """Versión async (y cacheada) de `_get_phonics_data_sync`."""
+    data = _cache_get(_phonics_cache, "phonics", "phonics")
+    if data is None:
+        data = await run_in_threadpool(_get_phonics_data_sync)
+        _cache_set(_phonics_cache, "phonics", data)
+    return data
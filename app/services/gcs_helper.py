@@ -5,10 +5,15 @@ Provides centralized utilities for interacting with GCS bucket.
 Handles blob operations, virtual directory listing, and error handling.
 """
 
+import io
 import logging
-from typing import List, Optional
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
+from requests.adapters import HTTPAdapter
 from google.cloud.exceptions import NotFound
+from google.api_core.exceptions import NotModified, PreconditionFailed, RequestRangeNotSatisfiable
 from app.core.config import settings
 
 
@@ -23,6 +28,14 @@ class GCSHelper:
         """Get or create storage client (singleton pattern)."""
         if cls._client is None:
             cls._client = storage.Client(project=settings.PROJECT_ID)
+            # The shared session keeps only 10 pooled connections by default;
+            # size it to the threadpool so concurrent calls reuse TCP+TLS
+            # connections instead of opening (and discarding) new ones.
+            adapter = HTTPAdapter(
+                pool_connections=settings.GCS_HTTP_POOL_SIZE,
+                pool_maxsize=settings.GCS_HTTP_POOL_SIZE,
+            )
+            cls._client._http.mount("https://", adapter)
             logging.info("✅ GCS Client initialized")
         return cls._client
     
@@ -35,6 +48,30 @@ class GCSHelper:
             logging.info(f"✅ GCS Bucket reference created: {settings.GCS_BUCKET_NAME}")
         return cls._bucket
     
+    @classmethod
+    def warm_up(cls) -> None:
+        """
+        Create the client, its connection pool and the bucket reference before the first request.
+        
+        Creating the client is lazy (no network), so one minimal authenticated
+        list call is also made: it fetches the OAuth token and opens the first
+        pooled TLS connection, which a fresh instance would otherwise pay on
+        its first real request.
+        """
+        bucket = cls._get_bucket()
+        blobs = bucket.list_blobs(prefix=f"{settings.GCS_JSON_PREFIX}/", max_results=1, fields="items(name)")
+        next(iter(blobs), None)
+        logging.info("✅ GCS connection warmed up")
+    
+    @classmethod
+    def close(cls) -> None:
+        """Close the pooled HTTP session (on application shutdown)."""
+        if cls._client is not None:
+            cls._client.close()
+            logging.info("🔌 GCS Client closed")
+        cls._client = None
+        cls._bucket = None
+    
     @classmethod
     def list_virtual_directories(cls, prefix: str) -> List[str]:
         """
@@ -48,8 +85,9 @@ class GCSHelper:
         """
         try:
             bucket = cls._get_bucket()
-            # Use delimiter to get "virtual directories"
-            blobs = bucket.list_blobs(prefix=prefix, delimiter="/")
+            # Use delimiter to get "virtual directories"; only the prefixes (and the
+            # paging token) are requested, not the metadata of the blobs at this level
+            blobs = bucket.list_blobs(prefix=prefix, delimiter="/", fields="prefixes,nextPageToken")
             
             # Consume the iterator to populate prefixes
             list(blobs)  # This is necessary to populate blobs.prefixes
@@ -61,28 +99,36 @@ class GCSHelper:
             return []
     
     @classmethod
-    def list_blobs_with_prefix(cls, prefix: str, extension: Optional[str] = None) -> List[str]:
+    def list_blobs_with_prefix(
+        cls,
+        prefix: str,
+        extension: Optional[str] = None,
+        max_results: Optional[int] = None,
+        match_glob: Optional[str] = None,
+    ) -> List[str]:
         """
         List all blob names with a given prefix, optionally filtered by extension.
+        Both filters are applied by GCS, so only matching names are returned.
         
         Args:
             prefix: The prefix to search under (e.g., "data/json/phrasal_verbs/")
-            extension: Optional file extension to filter (e.g., ".json")
+            extension: Optional file extension to filter (e.g., ".json"); shorthand for match_glob="**.json"
+            max_results: Optional cap on listed blobs (applied after the filters)
+            match_glob: Optional GCS glob the full blob name must match (overrides extension)
             
         Returns:
             List of blob names (full paths)
         """
         try:
             bucket = cls._get_bucket()
-            blobs = bucket.list_blobs(prefix=prefix)
-            
-            blob_names = [blob.name for blob in blobs]
-            
-            # Filter by extension if provided
-            if extension:
-                blob_names = [name for name in blob_names if name.endswith(extension)]
+            if match_glob is None and extension:
+                match_glob = f"**{extension}"
+            # Only names are read: a partial response skips size/md5/ACLs/... per blob
+            blobs = bucket.list_blobs(
+                prefix=prefix, max_results=max_results, match_glob=match_glob, fields="items(name),nextPageToken"
+            )
             
-            return blob_names
+            return [blob.name for blob in blobs]
         except Exception as e:
             logging.error(f"Error listing blobs with prefix '{prefix}': {e}")
             return []
@@ -106,6 +152,118 @@ class GCSHelper:
             logging.error(f"Error checking blob existence '{blob_path}': {e}")
             return False
     
+    @classmethod
+    def download_blob_if_modified(cls, blob_path: str, generation: Optional[int] = None) -> Tuple[int, Optional[bytes]]:
+        """
+        Download blob content unless the stored object is still at `generation`.
+        
+        A single conditional GET (ifGenerationNotMatch): an unchanged object
+        answers 304 without a body, so cached copies are revalidated without
+        a separate metadata request.
+        
+        Args:
+            blob_path: Full path to the blob
+            generation: Generation of the cached copy, or None to always download
+            
+        Returns:
+            Tuple of (current generation, content bytes or None if not modified)
+            
+        Raises:
+            NotFound: If the blob doesn't exist
+        """
+        try:
+            bucket = cls._get_bucket()
+            blob = bucket.blob(blob_path)
+            content = blob.download_as_bytes(if_generation_not_match=generation)
+            return blob.generation, content
+        except NotModified:
+            return generation, None
+        except NotFound:
+            raise
+        except Exception as e:
+            logging.error(f"Error downloading blob '{blob_path}': {e}")
+            raise
+    
+    @classmethod
+    def open_blob_chunks(cls, blob_path: str, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+        """
+        Start streaming blob content in chunks, without holding the whole object in memory.
+        
+        The first chunk is fetched eagerly, so a missing blob raises here (before
+        any response has been started) without a separate metadata request. The
+        remaining chunks are pinned to the generation of the first one.
+        
+        Args:
+            blob_path: Full path to the blob
+            chunk_size: Bytes requested per range read
+            
+        Returns:
+            Iterator over consecutive chunks of the blob content
+            
+        Raises:
+            NotFound: If the blob doesn't exist
+        """
+        bucket = cls._get_bucket()
+        blob = bucket.blob(blob_path)
+        try:
+            first = blob.download_as_bytes(start=0, end=chunk_size - 1)
+        except RequestRangeNotSatisfiable:
+            # Empty object: there is no byte 0 to read
+            return iter(())
+        return cls._iter_remaining_chunks(blob_path, blob.generation, first, chunk_size)
+    
+    @classmethod
+    def _iter_remaining_chunks(cls, blob_path: str, generation: Optional[int], first: bytes, chunk_size: int) -> Iterator[bytes]:
+        """Yield the already fetched first chunk, then range-read the rest of that generation."""
+        yield first
+        blob = cls._get_bucket().blob(blob_path, generation=generation)
+        position = len(first)
+        chunk = first
+        # A short chunk means the end of the object was reached
+        while len(chunk) == chunk_size:
+            try:
+                chunk = blob.download_as_bytes(start=position, end=position + chunk_size - 1)
+            except RequestRangeNotSatisfiable:
+                # Size was an exact multiple of chunk_size
+                return
+            if chunk:
+                yield chunk
+            position += len(chunk)
+    
+    @classmethod
+    def download_many_as_bytes(cls, blob_paths: List[str], max_workers: int = 8) -> Dict[str, Optional[bytes]]:
+        """
+        Download several blobs concurrently on a thread pool.
+        
+        The downloads share the client's pooled connections, so N blobs cost
+        roughly one round trip per batch of `max_workers` instead of N in series.
+        
+        Args:
+            blob_paths: Full paths of the blobs to download
+            max_workers: Maximum number of simultaneous downloads
+            
+        Returns:
+            Dict of blob path -> content (None if that blob failed or is missing)
+        """
+        if not blob_paths:
+            return {}
+        bucket = cls._get_bucket()
+        buffers = [io.BytesIO() for _ in blob_paths]
+        results = transfer_manager.download_many(
+            list(zip((bucket.blob(path) for path in blob_paths), buffers)),
+            worker_type=transfer_manager.THREAD,
+            max_workers=max_workers,
+        )
+        
+        contents: Dict[str, Optional[bytes]] = {}
+        for path, buffer, result in zip(blob_paths, buffers, results):
+            if isinstance(result, Exception):
+                logging.warning(f"Could not download blob '{path}': {result}")
+                contents[path] = None
+            else:
+                contents[path] = buffer.getvalue()
+        return contents
+    
     @classmethod
     def download_blob_as_string(cls, blob_path: str) -> str:
         """
@@ -125,11 +283,8 @@ class GCSHelper:
             bucket = cls._get_bucket()
             blob = bucket.blob(blob_path)
             
-            if not blob.exists():
-                raise NotFound(f"Blob not found: {blob_path}")
-            
-            content = blob.download_as_string()
-            return content.decode('utf-8')
+            # The GET itself answers 404 for a missing blob: no extra exists() round-trip
+            return blob.download_as_bytes().decode('utf-8')
         except NotFound:
             logging.error(f"Blob not found: {blob_path}")
             raise
@@ -156,9 +311,7 @@ class GCSHelper:
             bucket = cls._get_bucket()
             blob = bucket.blob(blob_path)
             
-            if not blob.exists():
-                raise NotFound(f"Blob not found: {blob_path}")
-            
+            # The GET itself answers 404 for a missing blob: no extra exists() round-trip
             return blob.download_as_bytes()
         except NotFound:
             logging.error(f"Blob not found: {blob_path}")
@@ -166,7 +319,35 @@ class GCSHelper:
         except Exception as e:
             logging.error(f"Error downloading blob '{blob_path}': {e}")
             raise
-    
+
+    @classmethod
+    def download_blob_range(cls, blob_path: str, start: int = 0, end: int = 65535) -> bytes:
+        """
+        Download only bytes [start, end] of a blob (inclusive, HTTP Range request).
+
+        Args:
+            blob_path: Full path to the blob
+            start: First byte offset
+            end: Last byte offset (clamped by GCS to the object size)
+
+        Returns:
+            The requested slice of the blob content
+
+        Raises:
+            NotFound: If blob doesn't exist
+            Exception: For other errors
+        """
+        try:
+            bucket = cls._get_bucket()
+            blob = bucket.blob(blob_path)
+            return blob.download_as_bytes(start=start, end=end)
+        except NotFound:
+            logging.error(f"Blob not found: {blob_path}")
+            raise
+        except Exception as e:
+            logging.error(f"Error downloading range of blob '{blob_path}': {e}")
+            raise
+
     @classmethod
     def upload_blob_from_string(cls, blob_path: str, content: str, content_type: str = "application/json") -> bool:
         """
@@ -195,6 +376,48 @@ class GCSHelper:
             logging.error(f"Error uploading blob '{blob_path}': {e}")
             return False
     
+    @classmethod
+    def upload_blob_with_generation(
+        cls,
+        blob_path: str,
+        content: Union[str, bytes],
+        content_type: str = "application/json",
+        if_generation_match: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Upload string (or already encoded bytes) content to a blob and return the new generation.
+        
+        Args:
+            blob_path: Full path where blob should be stored
+            content: String or bytes content to upload
+            content_type: MIME type of the content
+            if_generation_match: Optional precondition; the write only succeeds
+                if the stored object is still at this generation
+            
+        Returns:
+            Generation of the written object, or None if the upload failed
+            
+        Raises:
+            PreconditionFailed: If if_generation_match no longer matches (someone else wrote first)
+        """
+        try:
+            bucket = cls._get_bucket()
+            blob = bucket.blob(blob_path)
+            
+            blob.upload_from_string(
+                content,
+                content_type=content_type,
+                if_generation_match=if_generation_match
+            )
+            
+            logging.info(f"✅ Uploaded blob: {blob_path}")
+            return blob.generation
+        except PreconditionFailed:
+            raise
+        except Exception as e:
+            logging.error(f"Error uploading blob '{blob_path}': {e}")
+            return None
+    
     @classmethod
     def upload_blob_from_bytes(cls, blob_path: str, content: bytes, content_type: str = "application/octet-stream") -> bool:
         """
@@ -223,6 +446,36 @@ class GCSHelper:
             logging.error(f"Error uploading blob '{blob_path}': {e}")
             return False
     
+    @classmethod
+    def upload_blob_from_fileobj(cls, blob_path: str, fileobj: BinaryIO, content_type: str = "application/octet-stream") -> bool:
+        """
+        Upload a file-like object to a blob, streaming it in chunks
+        instead of loading the whole content in memory.
+        
+        Args:
+            blob_path: Full path where blob should be stored
+            fileobj: Binary file-like object (rewound before uploading)
+            content_type: MIME type of the content
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            bucket = cls._get_bucket()
+            blob = bucket.blob(blob_path)
+            
+            blob.upload_from_file(
+                fileobj,
+                rewind=True,
+                content_type=content_type
+            )
+            
+            logging.info(f"✅ Uploaded blob: {blob_path}")
+            return True
+        except Exception as e:
+            logging.error(f"Error uploading blob '{blob_path}': {e}")
+            return False
+    
     @classmethod
     def delete_blob(cls, blob_path: str) -> bool:
         """
@@ -238,22 +491,60 @@ class GCSHelper:
             bucket = cls._get_bucket()
             blob = bucket.blob(blob_path)
             
-            if blob.exists():
-                blob.delete()
-                logging.info(f"🗑️ Deleted blob: {blob_path}")
-                return True
-            else:
-                logging.warning(f"Blob not found for deletion: {blob_path}")
-                return False
+            # DELETE answers 404 for a missing blob: no extra exists() round-trip
+            blob.delete()
+            logging.info(f"🗑️ Deleted blob: {blob_path}")
+            return True
+        except NotFound:
+            logging.warning(f"Blob not found for deletion: {blob_path}")
+            return False
         except Exception as e:
             logging.error(f"Error deleting blob '{blob_path}': {e}")
             return False
-    
+
+    # Hard limit of deferred requests per `client.batch()` (google-cloud-storage)
+    _MAX_BATCH_SIZE = 1000
+
     @classmethod
+    def batch_delete(cls, blob_paths: Iterable[str]) -> bool:
+        """
+        Delete several blobs packed into multipart batch requests
+        (one HTTP round-trip per 1000 deletes instead of one per blob).
+        Blobs that no longer exist are ignored.
+
+        Args:
+            blob_paths: Full paths of the blobs to delete
+
+        Returns:
+            True if every batch was sent, False otherwise
+        """
+        paths = list(dict.fromkeys(blob_paths))
+        if not paths:
+            return True
+        try:
+            client = cls._get_client()
+            bucket = cls._get_bucket()
+            for start in range(0, len(paths), cls._MAX_BATCH_SIZE):
+                chunk = paths[start:start + cls._MAX_BATCH_SIZE]
+                # raise_exception=False: a 404 for one blob must not fail the rest
+                with client.batch(raise_exception=False):
+                    for blob_path in chunk:
+                        bucket.blob(blob_path).delete()
+            logging.info(f"🗑️ Batch-deleted {len(paths)} blobs")
+            return True
+        except Exception as e:
+            logging.error(f"Error batch-deleting {len(paths)} blobs: {e}")
+            return False
+
+    @classmethod
+    @lru_cache(maxsize=8192)
     def get_public_url(cls, blob_path: str) -> str:
         """
         Get the public URL for a blob.
         
+        Memoized: the URL only depends on the (fixed) bucket and the path, so
+        repeated lookups skip building a Blob and quoting its name.
+        
         Args:
             blob_path: Full path to the blob
             
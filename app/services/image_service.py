@@ -1,6 +1,10 @@
+import io
 import os
 import logging
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Tuple
 from requests.exceptions import Timeout, ConnectionError
 from app.core.config import settings, ia_model
 from app.services.gcs_helper import GCSHelper
@@ -8,51 +12,105 @@ from app.services.gcs_helper import GCSHelper
 from app.services import deck_service 
 
 
+# Acota las llamadas simultáneas a Imagen (individuales y por lotes) a la cuota de Vertex AI
+_ia_semaphore = threading.BoundedSemaphore(settings.IMAGE_GEN_MAX_CONCURRENCY)
+
+
 # --- ¡REFACTORIZADA PARA GCS! ---
+# Prefijos memoizados: hay pocos decks y se piden una vez por tarjeta/definición
+@lru_cache(maxsize=1024)
 def _get_image_blob_prefix(category: str, deck_name: str) -> str:
     """Retorna el prefijo del blob en GCS para las imágenes de un deck."""
     folder_name = deck_name.replace(".json", "")
     return f"{settings.GCS_IMAGES_PREFIX}/{category}/{folder_name}"
 
+@lru_cache(maxsize=1024)
 def _get_deck_prefix(deck_name: str) -> str:
     """Extrae el nombre base del deck/verbo."""
     return deck_name.replace(".json", "")
 
+def _get_image_base_path(category: str, deck_name: str, card_index: int, def_index: int) -> str:
+    """Ruta del blob de una imagen sin extensión: '<prefijo>/<deck>_card_<i>_def<j>'."""
+    return f"{_get_image_blob_prefix(category, deck_name)}/{_get_deck_prefix(deck_name)}_card_{card_index}_def{def_index}"
+
 def get_image_blob_path(category: str, deck_name: str, card_index: int, def_index: int) -> str:
     """Construye la ruta completa del blob en GCS donde debería estar una imagen."""
-    prefix = _get_image_blob_prefix(category, deck_name)
-    deck_prefix = _get_deck_prefix(deck_name)
     # Importante: siempre usa .jpg como extensión final para estandarizar
-    filename = f"{deck_prefix}_card_{card_index}_def{def_index}.jpg"
-    return f"{prefix}/{filename}"
+    return f"{_get_image_base_path(category, deck_name, card_index, def_index)}.jpg"
 
-def find_existing_image_path(category: str, deck_name: str, card_index: int, def_index: int) -> Optional[str]:
-    """Busca una imagen existente en GCS (jpg o jpeg)."""
-    gcs = GCSHelper()
-    prefix = _get_image_blob_prefix(category, deck_name)
-    deck_prefix = _get_deck_prefix(deck_name)
-    base_filename = f"{deck_prefix}_card_{card_index}_def{def_index}"
-    
-    # Verificar .jpg
-    jpg_path = f"{prefix}/{base_filename}.jpg"
-    if gcs.blob_exists(jpg_path):
-        return jpg_path
-    
-    # Verificar .jpeg
-    jpeg_path = f"{prefix}/{base_filename}.jpeg"
-    if gcs.blob_exists(jpeg_path):
-        return jpeg_path
-    
+def _pick_existing_image(base_path: str, known: Set[str]) -> Optional[str]:
+    """Elige entre '<base>.jpg' y '<base>.jpeg' (prioridad .jpg) según los nombres conocidos."""
+    for extension in (".jpg", ".jpeg"):
+        if base_path + extension in known:
+            return base_path + extension
     return None
 
-def generate_image(prompt: str, category: str, deck_name: str, card_index: int, def_index: int, force_generation: bool) -> tuple[bool, str, str]:
+def find_existing_image_path(
+    category: str, deck_name: str, card_index: int, def_index: int, known: Optional[Set[str]] = None
+) -> Optional[str]:
+    """
+    Busca una imagen existente en GCS (jpg o jpeg).
+    Con `known` (nombres ya listados del deck) se resuelve sin tocar GCS; sin él,
+    un solo listado por el prefijo '<base>.' cubre ambas extensiones (antes, dos HEAD).
+    """
+    base_path = _get_image_base_path(category, deck_name, card_index, def_index)
+    
+    if known is None:
+        # El punto final evita que '..._def1' coincida también con '..._def10.jpg'
+        known = set(GCSHelper().list_blobs_with_prefix(f"{base_path}.", max_results=5))
+    return _pick_existing_image(base_path, known)
+
+def _list_deck_images(category: str, deck_name: str) -> Set[str]:
+    """Nombres de todos los blobs de imagen del deck (un solo listado)."""
+    # Barra final: 'deck/' no debe coincidir también con 'deck-2/'
+    return set(GCSHelper().list_blobs_with_prefix(f"{_get_image_blob_prefix(category, deck_name)}/"))
+
+def find_existing_image_paths(
+    category: str, deck_name: str, indices: Iterable[Tuple[int, int]]
+) -> Dict[Tuple[int, int], Optional[str]]:
+    """
+    Versión por lotes de `find_existing_image_path`: lista una vez las imágenes del
+    deck y resuelve cada (card_index, def_index) en memoria.
+    """
+    known = _list_deck_images(category, deck_name)
+    return {
+        (card_index, def_index): find_existing_image_path(category, deck_name, card_index, def_index, known=known)
+        for card_index, def_index in indices
+    }
+
+def _upload_image_as_jpeg(gcs: GCSHelper, blob_path: str, image_obj) -> bool:
+    """
+    Sube una imagen de Vertex AI como JPEG. Si el modelo ya la devolvió en JPEG se
+    suben sus bytes tal cual (recodificarlos perdería calidad); solo un PNG pasa por
+    PIL, con JPEG_QUALITY, y el buffer resultante se sube sin copiarlo con getvalue().
+    """
+    raw = image_obj._image_bytes
+    if raw[:3] == b"\xff\xd8\xff":
+        return gcs.upload_blob_from_bytes(blob_path, raw, content_type="image/jpeg")
+    buffer = io.BytesIO()
+    # optimize + progressive: archivos más pequeños (menos bytes a GCS y al navegador)
+    image_obj._pil_image.save(
+        buffer, format='JPEG', quality=settings.JPEG_QUALITY, optimize=True, progressive=True, subsampling=2
+    )
+    return gcs.upload_blob_from_fileobj(blob_path, buffer, content_type="image/jpeg")
+
+def generate_image(
+    prompt: str,
+    category: str,
+    deck_name: str,
+    card_index: int,
+    def_index: int,
+    force_generation: bool,
+    known: Optional[Set[str]] = None,
+) -> tuple[bool, str, str]:
     """
     Genera una imagen si es necesario y la sube a GCS.
+    `known` (opcional) son los nombres ya listados del deck, ver `find_existing_image_path`.
     Retorna (success, error_message, blob_path_or_url)
     """
     gcs = GCSHelper()
     blob_path = get_image_blob_path(category, deck_name, card_index, def_index)
-    existing_path = find_existing_image_path(category, deck_name, card_index, def_index)
+    existing_path = find_existing_image_path(category, deck_name, card_index, def_index, known=known)
 
     if existing_path:
         logging.info(f"✅ Imagen ya existe en GCS: {existing_path}")
@@ -66,20 +124,15 @@ def generate_image(prompt: str, category: str, deck_name: str, card_index: int,
         
     logging.info(f"🖼️ Generando imagen para GCS: '{prompt[:80]}...'")
     try:
-        response = ia_model.generate_images(prompt=prompt, number_of_images=1, aspect_ratio="1:1")
+        with _ia_semaphore:
+            response = ia_model.generate_images(prompt=prompt, number_of_images=1, aspect_ratio="1:1")
         if not response.images:
             return False, "La API no devolvió ninguna imagen.", blob_path
         
         # Guardar la imagen en GCS directamente desde el buffer de memoria
         image_obj = response.images[0]
-        # Convertir la imagen a bytes
-        import io
-        image_bytes = io.BytesIO()
-        image_obj._pil_image.save(image_bytes, format='JPEG')
-        image_bytes = image_bytes.getvalue()
-        
-        # Subir a GCS
-        success = gcs.upload_blob_from_bytes(blob_path, image_bytes, content_type="image/jpeg")
+        # Convertir la imagen a JPEG (si hace falta) y subir a GCS
+        success = _upload_image_as_jpeg(gcs, blob_path, image_obj)
         
         if success:
             logging.info(f"✅ Imagen generada y subida a GCS: {blob_path}")
@@ -92,6 +145,25 @@ def generate_image(prompt: str, category: str, deck_name: str, card_index: int,
     except Exception as e:
         return False, f"Error interno de la API de IA: {e}", blob_path
 
+def generate_images_bulk(
+    category: str, deck_name: str, items: List[Tuple[str, int, int]], force_generation: bool
+) -> List[tuple[bool, str, str]]:
+    """
+    `generate_image` para varias (prompt, card_index, def_index) de un deck a la vez.
+    Las imágenes existentes salen de un único listado del deck; las que hay que
+    generar se reparten en hilos (la espera a Vertex AI y a GCS no retiene el GIL),
+    con las llamadas a Imagen acotadas por IMAGE_GEN_MAX_CONCURRENCY.
+    Retorna una tupla (success, error_message, blob_path_or_url) por item, en orden.
+    """
+    known = _list_deck_images(category, deck_name)
+
+    def run(item: Tuple[str, int, int]) -> tuple[bool, str, str]:
+        prompt, card_index, def_index = item
+        return generate_image(prompt, category, deck_name, card_index, def_index, force_generation, known=known)
+
+    with ThreadPoolExecutor(max_workers=settings.IMAGE_GEN_MAX_CONCURRENCY) as pool:
+        return list(pool.map(run, items))
+
 def delete_image(category: str, deck_name: str, card_index: int, def_index: int) -> tuple[bool, str]:
     """Elimina una imagen de GCS si existe."""
     gcs = GCSHelper()
@@ -106,17 +178,34 @@ def delete_image(category: str, deck_name: str, card_index: int, def_index: int)
     else:
         return False, "Error al eliminar imagen de GCS."
 
+def delete_images_bulk(
+    category: str, deck_name: str, indices: List[Tuple[int, int]]
+) -> List[tuple[bool, str]]:
+    """
+    `delete_image` para varias (card_index, def_index) de un deck a la vez: las
+    imágenes existentes salen de un único listado y se borran en una sola
+    petición batch de GCS. Retorna una tupla (success, message) por item, en orden.
+    """
+    paths = find_existing_image_paths(category, deck_name, indices)
+    if not GCSHelper().batch_delete(path for path in paths.values() if path):
+        return [(False, "Error al eliminar imagen de GCS.")] * len(indices)
+    return [
+        (True, "Imagen eliminada de GCS." if paths[key] else "Imagen no encontrada en GCS.")
+        for key in indices
+    ]
+
 # --- ¡REFACTORIZADA PARA GCS! ---
 def upload_image(
     category: str, 
     deck_name: str, 
     card_index: int, 
     def_index: int, 
-    file_content: bytes, 
+    file_obj: BinaryIO, 
     file_extension: str = '.jpg'
 ) -> tuple[bool, str, str]:
     """
-    Guarda el contenido binario de una imagen subida en GCS.
+    Guarda en GCS una imagen subida, transmitiéndola desde el archivo
+    temporal (sin cargarla entera en memoria).
     Retorna (success, error_message, blob_path_or_url)
     """
     gcs = GCSHelper()
@@ -129,8 +218,8 @@ def upload_image(
         logging.info(f"Antigua imagen eliminada de GCS: {existing_path}")
 
     try:
-        # Subir el archivo binario a GCS
-        success = gcs.upload_blob_from_bytes(blob_path, file_content, content_type="image/jpeg")
+        # Subir el archivo binario a GCS (upload por chunks desde el archivo)
+        success = gcs.upload_blob_from_fileobj(blob_path, file_obj, content_type="image/jpeg")
         
         if not success:
             return False, "Error al subir imagen a GCS", blob_path
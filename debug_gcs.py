@@ -1,19 +1,21 @@
 import sys
-from google.cloud import storage
+from app.services.gcs_helper import GCSHelper
 from app.core.config import settings
 
 def debug_image():
-    client = storage.Client(project=settings.PROJECT_ID)
-    bucket = client.bucket(settings.GCS_BUCKET_NAME)
+    # Shared GCSHelper singleton: one client (credentials + pooled session) per process
+    bucket = GCSHelper._get_bucket()
     
     # The path from the logs
     blob_path = "card_images/phrasal_verbs/break/break_card_0_def0.jpg"
-    blob = bucket.blob(blob_path)
     
     print(f"🔍 Checking blob: {blob_path}")
     print(f"   Bucket: {settings.GCS_BUCKET_NAME}")
     
-    if blob.exists():
+    # A single GET: existence check plus size/content_type (and, with
+    # projection="full", the ACL) in the same response
+    blob = bucket.get_blob(blob_path, projection="full")
+    if blob is not None:
         print("✅ Blob EXISTS in GCS")
         print(f"   Size: {blob.size} bytes")
         print(f"   Content Type: {blob.content_type}")
@@ -21,8 +23,20 @@ def debug_image():
         
         # Check ACLs
         print("   ACLs:")
-        for entry in blob.acl:
+        # Reuse the ACL returned by get_blob; only fall back to the
+        # separate /acl request if the response didn't include it
+        full_acl = blob._properties.get("acl")
+        if full_acl is not None:
+            acl_entries = [{"entity": e["entity"], "role": e["role"]} for e in full_acl]
+        else:
+            acl_entries = list(blob.acl)
+        for entry in acl_entries:
             print(f"    - {entry}")
+        
+        # Already readable by allUsers: skip the make_public() round-trip
+        if {"entity": "allUsers", "role": "READER"} in acl_entries:
+            print("   ✅ Already public (allUsers: READER).")
+            return
             
         # Try to make it explicitly public to be sure
         try:
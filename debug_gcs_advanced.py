@@ -1,55 +1,75 @@
 import sys
 import requests
-from google.cloud import storage
+from concurrent.futures import ThreadPoolExecutor
+from app.services.gcs_helper import GCSHelper
 from app.core.config import settings
 
-def debug_advanced():
-    client = storage.Client(project=settings.PROJECT_ID)
-    bucket = client.bucket(settings.GCS_BUCKET_NAME)
-    
-    target_path = "card_images/phrasal_verbs/break/break_card_0_def0.jpg"
-    
-    print(f"🔍 Advanced Debugging for: {target_path}")
-    
-    # 1. List files with repr() to see hidden chars
-    prefix = "card_images/phrasal_verbs/break/"
-    print(f"\n📂 Listing blobs in '{prefix}':")
-    blobs = list(bucket.list_blobs(prefix=prefix))
-    found_exact_match = False
-    for b in blobs:
-        print(f"   - Name: {repr(b.name)}")
-        print(f"     Size: {b.size}")
-        print(f"     Type: {b.content_type}")
-        if b.name == target_path:
-            found_exact_match = True
-            
-    if found_exact_match:
-        print("\n✅ Exact match found in listing.")
-    else:
-        print("\n❌ NO exact match found in listing!")
-        
-    # 2. Try authenticated download
-    print("\n🔑 Testing Authenticated Download...")
-    blob = bucket.blob(target_path)
+# Unauthenticated session shared by every public-URL probe: the error-body GET
+# (and any further probes) reuse the keep-alive TLS connection of the first HEAD
+public_session = requests.Session()
+
+def download_authenticated(blob):
+    """Authenticated download; returns the lines to print."""
     try:
         content = blob.download_as_bytes()
-        print(f"   ✅ Downloaded {len(content)} bytes successfully.")
+        return [f"   ✅ Downloaded {len(content)} bytes successfully."]
     except Exception as e:
-        print(f"   ❌ Authenticated download failed: {e}")
+        return [f"   ❌ Authenticated download failed: {e}"]
 
-    # 3. Try Unauthenticated Public Access
-    public_url = f"https://storage.googleapis.com/{settings.GCS_BUCKET_NAME}/{target_path}"
-    print(f"\n🌐 Testing Public URL: {public_url}")
+def download_public(public_url):
+    """Unauthenticated probe of the public URL; returns the lines to print."""
     try:
-        resp = requests.get(public_url)
-        print(f"   Status Code: {resp.status_code}")
+        # HEAD is enough to see 200/403; the body is only fetched to show an error
+        resp = public_session.head(public_url, allow_redirects=True, timeout=5)
+        lines = [f"   Status Code: {resp.status_code}"]
         if resp.status_code == 200:
-            print("   ✅ Public access working.")
+            lines.append("   ✅ Public access working.")
         else:
-            print("   ❌ Public access FAILED.")
-            print(f"   Response: {resp.text[:200]}")
+            lines.append("   ❌ Public access FAILED.")
+            resp = public_session.get(public_url, timeout=5)
+            lines.append(f"   Response: {resp.text[:200]}")
+        return lines
     except Exception as e:
-        print(f"   ❌ Request failed: {e}")
+        return [f"   ❌ Request failed: {e}"]
+
+def debug_advanced():
+    # Shared GCSHelper singleton: one client (credentials + pooled session) per process
+    bucket = GCSHelper._get_bucket()
+
+    target_path = "card_images/phrasal_verbs/break/break_card_0_def0.jpg"
+    public_url = f"https://storage.googleapis.com/{settings.GCS_BUCKET_NAME}/{target_path}"
+
+    print(f"🔍 Advanced Debugging for: {target_path}")
+
+    # 2 + 3 are independent I/O: start both downloads while the lookup runs
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        auth_future = pool.submit(download_authenticated, bucket.blob(target_path))
+        public_future = pool.submit(download_public, public_url)
+
+        # 1. Exact-object GET (repr() to see hidden chars); only list the folder on a miss
+        print("\n📄 Looking up exact object:")
+        hit = bucket.get_blob(target_path)
+        if hit is not None:
+            print(f"   - Name: {repr(hit.name)}")
+            print(f"     Size: {hit.size}")
+            print(f"     Type: {hit.content_type}")
+            print("\n✅ Exact match found.")
+        else:
+            print("\n❌ NO exact match found!")
+            prefix = "card_images/phrasal_verbs/break/"
+            print(f"\n📂 Listing blobs in '{prefix}' (first 50):")
+            for b in bucket.list_blobs(prefix=prefix, max_results=50):
+                print(f"   - Name: {repr(b.name)}")
+                print(f"     Size: {b.size}")
+                print(f"     Type: {b.content_type}")
+
+        # 2. Try authenticated download
+        print("\n🔑 Testing Authenticated Download...")
+        print("\n".join(auth_future.result()))
+
+        # 3. Try Unauthenticated Public Access
+        print(f"\n🌐 Testing Public URL: {public_url}")
+        print("\n".join(public_future.result()))
 
 if __name__ == "__main__":
     debug_advanced()
@@ -1,5 +1,6 @@
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from app.services.gcs_helper import GCSHelper
 from app.core.config import settings
 
@@ -13,7 +14,14 @@ def check_permissions():
         
         # 1. Check List Permissions
         print("\n1️⃣ Testing List Permissions...")
-        blobs = gcs.list_blobs_with_prefix(settings.GCS_AUDIO_PREFIX, extension=".mp3")
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # The full listing (only needed for the count) runs in the background;
+            # the download test only needs the first name (max_results=1).
+            all_blobs = pool.submit(gcs.list_blobs_with_prefix, settings.GCS_AUDIO_PREFIX, extension=".mp3")
+            first = gcs.list_blobs_with_prefix(settings.GCS_AUDIO_PREFIX, extension=".mp3", max_results=1)
+            # A ranged read (first 64 KiB) proves read access at constant cost, whatever the mp3 size
+            download = pool.submit(gcs.download_blob_range, first[0], 0, 65535) if first else None
+            blobs = all_blobs.result()
         print(f"✅ List successful. Found {len(blobs)} audio files.")
         if len(blobs) > 0:
             print(f"   Example: {blobs[0]}")
@@ -24,8 +32,10 @@ def check_permissions():
             print(f"   Attempting to download: {blob_path}")
             
             try:
-                content = gcs.download_blob_as_bytes(blob_path)
-                print(f"✅ Download successful. Size: {len(content)} bytes")
+                if download is None:
+                    raise RuntimeError("the first listing returned nothing")
+                content = download.result()
+                print(f"✅ Download successful. First {len(content)} bytes readable")
             except Exception as e:
                 print(f"❌ Download FAILED: {e}")
         else:
@@ -1,4 +1,4 @@
-import json
+import orjson
 import os # Necesario para renombrar archivos de forma segura
 
 # --- Configuración de Archivos ---
@@ -12,8 +12,8 @@ def limpiar_duplicados_en_sitio():
     
     # --- Paso 1: Cargar todos los nombres del archivo Básico ---
     try:
-        with open(BASIC_FILE, 'r', encoding='utf-8') as f:
-            basic_data = json.load(f)
+        with open(BASIC_FILE, 'rb') as f:
+            basic_data = orjson.loads(f.read())
         
         # Usamos un "set" para una búsqueda súper rápida
         basic_names = set(item['name'] for item in basic_data if 'name' in item)
@@ -35,8 +35,8 @@ def limpiar_duplicados_en_sitio():
     total_items_read = 0
     
     try:
-        with open(INTERMEDIATE_FILE, 'r', encoding='utf-8') as f:
-            intermediate_data = json.load(f)
+        with open(INTERMEDIATE_FILE, 'rb') as f:
+            intermediate_data = orjson.loads(f.read())
         
         total_items_read = len(intermediate_data)
         print(f"Procesando '{INTERMEDIATE_FILE}' (leyendo {total_items_read} items)...")
@@ -65,7 +65,7 @@ def limpiar_duplicados_en_sitio():
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo '{INTERMEDIATE_FILE}'.")
         return
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         print(f"Error: El archivo '{INTERMEDIATE_FILE}' parece estar mal formateado o vacío.")
         return
     except Exception as e:
@@ -75,12 +75,11 @@ def limpiar_duplicados_en_sitio():
     # --- Paso 3: Guardar el nuevo archivo limpio (de forma segura) ---
     try:
         # Escribimos en un archivo temporal primero
-        with open(TEMP_FILE, 'w', encoding='utf-8') as f:
-            json.dump(clean_intermediate_list, f, indent=2, ensure_ascii=False)
+        with open(TEMP_FILE, 'wb') as f:
+            f.write(orjson.dumps(clean_intermediate_list, option=orjson.OPT_INDENT_2))
         
-        # Si todo salió bien, eliminamos el original y renombramos el temporal
-        os.remove(INTERMEDIATE_FILE)
-        os.rename(TEMP_FILE, INTERMEDIATE_FILE)
+        # Si todo salió bien, el temporal reemplaza al original en un solo paso atómico
+        os.replace(TEMP_FILE, INTERMEDIATE_FILE)
             
         print("\n--- ¡Éxito! ---")
         print(f"Items leídos: {total_items_read}")
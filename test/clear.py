@@ -1,4 +1,4 @@
-import json
+import orjson
 import os # Necesario para renombrar archivos de forma segura
 
 # --- Configuración de Archivos ---
@@ -21,8 +21,8 @@ def clean_json_file(file_to_clean, names_to_exclude_set):
     
     # --- Paso 1: Leer y filtrar ---
     try:
-        with open(file_to_clean, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(file_to_clean, 'rb') as f:
+            data = orjson.loads(f.read())
         
         if not isinstance(data, list):
              print(f"Error: El archivo '{file_to_clean}' no contiene una lista JSON. Abortando este archivo.")
@@ -31,11 +31,11 @@ def clean_json_file(file_to_clean, names_to_exclude_set):
         total_read = len(data)
         
         for item in data:
-            if not isinstance(item, dict) or 'name' not in item:
+            # Una sola búsqueda en el dict por item
+            name = item.get('name') if isinstance(item, dict) else None
+            if name is None:
                 continue # Ignorar items no válidos
             
-            name = item['name']
-            
             # 1. ¿Está en la lista de exclusión (superposición)?
             if name in names_to_exclude_set:
                 external_dupes += 1
@@ -53,7 +53,7 @@ def clean_json_file(file_to_clean, names_to_exclude_set):
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo '{file_to_clean}'.")
         return None
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         print(f"Error: El archivo '{file_to_clean}' está mal formateado o vacío.")
         return None
     except Exception as e:
@@ -63,12 +63,12 @@ def clean_json_file(file_to_clean, names_to_exclude_set):
     # --- Paso 2: Guardar de forma segura ---
     temp_file = file_to_clean + ".tmp"
     try:
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(clean_list, f, indent=2, ensure_ascii=False)
+        with open(temp_file, 'wb') as f:
+            f.write(orjson.dumps(clean_list, option=orjson.OPT_INDENT_2))
         
         # Si la escritura fue exitosa, reemplazar el original
-        os.remove(file_to_clean)
-        os.rename(temp_file, file_to_clean)
+        # (os.replace es atómico: nunca queda el archivo sin original ni temporal)
+        os.replace(temp_file, file_to_clean)
         
         print(f"--- Limpieza de '{file_to_clean}' completa ---")
         print(f"Items leídos: {total_read}")
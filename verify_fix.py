@@ -1,5 +1,10 @@
 import requests
 import json
+from requests.adapters import HTTPAdapter
+
+# One pooled session: the proxy download reuses the synthesize request's connection
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
 
 url = "http://localhost:8000/api/synthesize-speech"
 
@@ -14,7 +19,7 @@ payload = {
 }
 
 try:
-    response = requests.post(url, json=payload)
+    response = session.post(url, json=payload)
     if response.status_code == 200:
         data = response.json()
         audio_url = data.get("audio_url")
@@ -29,12 +34,14 @@ try:
             proxy_full_url = audio_url
             print(f"Testing Proxy Download: {proxy_full_url}")
             
-            audio_response = requests.get(proxy_full_url)
-            if audio_response.status_code == 200:
-                print(f"✅ SUCCESS: Audio downloaded successfully. Size: {len(audio_response.content)} bytes")
-            else:
-                print(f"❌ FAILURE: Could not download audio. Status: {audio_response.status_code}")
-                print(f"Response: {audio_response.text}")
+            # Streamed: only the size is needed, the body is never kept in memory
+            with session.get(proxy_full_url, stream=True) as audio_response:
+                if audio_response.status_code == 200:
+                    size = sum(len(chunk) for chunk in audio_response.iter_content(chunk_size=65536))
+                    print(f"✅ SUCCESS: Audio downloaded successfully. Size: {size} bytes")
+                else:
+                    print(f"❌ FAILURE: Could not download audio. Status: {audio_response.status_code}")
+                    print(f"Response: {audio_response.text}")
         else:
             print("❌ FAILURE: Audio URL is NOT a proxy URL.")
     else:
@@ -11,10 +11,27 @@ from pathlib import Path
 # Añadir el directorio raíz al path para importar módulos
 sys.path.insert(0, str(Path(__file__).parent))
 
-from google.cloud import storage
+from app.services.gcs_helper import GCSHelper
 from app.core.config import settings
 
-def main():
+# Extensiones esperadas por tipo de recurso (sin punto, en minúsculas)
+JSON_EXTS = frozenset({'json'})
+IMAGE_EXTS = frozenset({'jpg', 'jpeg', 'png'})
+AUDIO_EXTS = frozenset({'mp3'})
+
+def _has_ext(name, exts):
+    """Una sola búsqueda en un frozenset en lugar de varios endswith()."""
+    _, dot, ext = name.rpartition('.')
+    return bool(dot) and ext.lower() in exts
+
+def main(quick=False):
+    """
+    Con quick=True (--quick) solo se comprueba que haya al menos un recurso de
+    cada tipo: cada listado pide un único objeto y no se imprimen los nombres.
+    """
+    # Objetos pedidos por listado de imágenes/audio (y de JSONs en modo rápido)
+    sample_size = 1 if quick else 10
+    
     print("=" * 60)
     print("🔍 VERIFICACIÓN DE MIGRACIÓN A GCS")
     print("=" * 60)
@@ -31,14 +48,18 @@ def main():
     try:
         # 2. Conectar al bucket
         print("🔌 Conectando a Google Cloud Storage...")
-        client = storage.Client(project=settings.PROJECT_ID)
-        bucket = client.bucket(settings.GCS_BUCKET_NAME)
+        # Singleton de GCSHelper: un solo cliente (credenciales + sesión con pool) por proceso
+        bucket = GCSHelper._get_bucket()
         print(f"✅ Conexión exitosa al bucket '{settings.GCS_BUCKET_NAME}'")
         print()
         
         # 3. Listar categorías (simulando deck_service.list_categories)
         print(f"📁 Listando categorías desde '{settings.GCS_JSON_PREFIX}/'...")
-        blobs = bucket.list_blobs(prefix=f"{settings.GCS_JSON_PREFIX}/", delimiter="/")
+        # Solo los prefijos (las categorías son pocas: max_results=100 basta)
+        blobs = bucket.list_blobs(
+            prefix=f"{settings.GCS_JSON_PREFIX}/", delimiter="/", max_results=100,
+            fields="prefixes,nextPageToken"
+        )
         
         # Consumir el iterador para poblar prefixes
         list(blobs)
@@ -64,14 +85,18 @@ def main():
             first_category = categories[0]
             print(f"📄 Verificando JSONs en categoría '{first_category}'...")
             json_prefix = f"{settings.GCS_JSON_PREFIX}/{first_category}/"
-            json_blobs = list(bucket.list_blobs(prefix=json_prefix))
-            json_files = [blob.name for blob in json_blobs if blob.name.endswith('.json')]
+            # El filtro por extensión lo aplica GCS y solo se piden los nombres
+            json_blobs = list(bucket.list_blobs(
+                prefix=json_prefix, max_results=1 if quick else None,
+                match_glob="**.json", fields="items(name),nextPageToken"
+            ))
+            json_files = [blob.name for blob in json_blobs if _has_ext(blob.name, JSON_EXTS)]
             
             if json_files:
                 print(f"✅ Encontrados {len(json_files)} archivos JSON:")
-                for json_file in json_files[:5]:  # Mostrar solo los primeros 5
+                for json_file in ([] if quick else json_files[:5]):  # Mostrar solo los primeros 5
                     print(f"   - {json_file}")
-                if len(json_files) > 5:
+                if not quick and len(json_files) > 5:
                     print(f"   ... y {len(json_files) - 5} más")
                 print()
             else:
@@ -80,12 +105,15 @@ def main():
         
         # 5. Verificar imágenes
         print(f"🖼️  Verificando imágenes en '{settings.GCS_IMAGES_PREFIX}/'...")
-        image_blobs = list(bucket.list_blobs(prefix=f"{settings.GCS_IMAGES_PREFIX}/", max_results=10))
-        image_files = [blob.name for blob in image_blobs if blob.name.endswith(('.jpg', '.jpeg', '.png'))]
+        image_blobs = list(bucket.list_blobs(
+            prefix=f"{settings.GCS_IMAGES_PREFIX}/", max_results=sample_size,
+            match_glob="**.{jpg,jpeg,png}", fields="items(name),nextPageToken"
+        ))
+        image_files = [blob.name for blob in image_blobs if _has_ext(blob.name, IMAGE_EXTS)]
         
         if image_files:
             print(f"✅ Encontradas imágenes (mostrando primeras {len(image_files)}):")
-            for img in image_files[:5]:
+            for img in ([] if quick else image_files[:5]):
                 print(f"   - {img}")
             print()
         else:
@@ -94,12 +122,15 @@ def main():
         
         # 6. Verificar audio
         print(f"🔊 Verificando audio en '{settings.GCS_AUDIO_PREFIX}/'...")
-        audio_blobs = list(bucket.list_blobs(prefix=f"{settings.GCS_AUDIO_PREFIX}/", max_results=10))
-        audio_files = [blob.name for blob in audio_blobs if blob.name.endswith('.mp3')]
+        audio_blobs = list(bucket.list_blobs(
+            prefix=f"{settings.GCS_AUDIO_PREFIX}/", max_results=sample_size,
+            match_glob="**.mp3", fields="items(name),nextPageToken"
+        ))
+        audio_files = [blob.name for blob in audio_blobs if _has_ext(blob.name, AUDIO_EXTS)]
         
         if audio_files:
             print(f"✅ Encontrados archivos de audio (mostrando primeros {len(audio_files)}):")
-            for audio in audio_files[:5]:
+            for audio in ([] if quick else audio_files[:5]):
                 print(f"   - {audio}")
             print()
         else:
@@ -145,5 +176,6 @@ def main():
         return False
 
 if __name__ == "__main__":
-    success = main()
+    # --quick: solo comprobar presencia (un objeto por listado)
+    success = main(quick="--quick" in sys.argv[1:])
     sys.exit(0 if success else 1)